@@ -0,0 +1,294 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import numpy as np
+from track import Track
+from sensors import RaySensor, CachedRaySensor, calculate_sensors_loop
+from car import Car
+from qlearn import QLearn
+from trainer import Trainer
+from kinematics import Kinematics
+
+SUITE_SYNTHETIC = [100, 1000, 10000]
+ROUNDS = 7  # 整個 suite 重複的輪數 (每個項目的量測分散在不同時間)
+# 與賽道無關的項目 (只在第一條賽道上量測)
+TRACK_INDEPENDENT = ('kinematics.step', 'kinematics.step_batch', 'qlearn.choose_action', 'qlearn.update_q_value', 'render.frame')
+BASELINE_FILE = 'benchmark_baseline.json'
+
+# 在賽道範圍內隨機取樣車子位置與角度
+def random_poses(track, count, seed=0):
+    rng = np.random.default_rng(seed)
+    points = np.asarray(track, dtype=float)
+    xs = rng.uniform(points[:, 0].min(), points[:, 0].max(), count)
+    ys = rng.uniform(points[:, 1].min(), points[:, 1].max(), count)
+    phis = rng.uniform(-180, 180, count)
+    return xs, ys, phis
+
+# 產生蛇行賽道：一條由 segments 個短牆段組成、來回折返的折線，列距 12
+def synthetic_track(segments, segment_length=4.0, row_segments=50, row_spacing=12.0):
+    points = [[0.0, 0.0]]
+    row = 0
+    while len(points) <= segments:
+        x, y = points[-1]
+        if len(points) % (row_segments + 1) == 0:
+            points.append([x, y + row_spacing])
+            row += 1
+        else:
+            points.append([x + (segment_length if row % 2 == 0 else -segment_length), y])
+    return points
+
+# 蛇行賽道加上起點 (第一、二列之間，朝 +x) 與到不了的終點，供完整回合使用
+def synthetic_course(segments):
+    return Track(synthetic_track(segments), start=[4.0, 6.0, 0.0], finish_top_left=[1e9, 1e9], finish_bottom_right=[1e9, 1e9])
+
+# 逐次計時 func(i) (setup(i) 不計時)，回傳每秒呼叫數與延遲百分位數 (us)；times 為每次呼叫的原始時間
+# 計時期間與 timeit 一樣關閉 gc
+def measure(func, calls, setup=None, warmup=10):
+    for i in range(min(warmup, calls)):
+        if setup is not None:
+            setup(i)
+        func(i)
+    clock = time.perf_counter_ns
+    times = np.empty(calls)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(calls):
+            if setup is not None:
+                setup(i)
+            start = clock()
+            func(i)
+            times[i] = clock() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+    times /= 1e3
+    stats = summarize(times[None, :])
+    stats['times'] = times
+    return stats
+
+# times 為 (輪數, 呼叫數)：同一個位置每輪做同樣的工作
+# p50_us 取每個呼叫在各輪中的最短時間後再取中位數 (只要某一輪沒被其他程式或 CPU 頻率拖慢即可)，作為比較的依據
+# median_p50_us 為各輪中位數的中位數，其餘統計取自所有輪
+def summarize(times):
+    return {
+        'calls': times.shape[1],
+        'per_sec': times.shape[1] / (times.sum(axis=1).mean() / 1e6),
+        'mean_us': float(times.mean()),
+        'p50_us': float(np.median(times.min(axis=0))),
+        'median_p50_us': float(np.median(np.median(times, axis=1))),
+        'p90_us': float(np.percentile(times, 90)),
+        'p99_us': float(np.percentile(times, 99)),
+    }
+
+# 訓練回合中連續的車子位置 (x, y, phi)，共 count 步
+def trajectory_poses(track, count, seed=0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer = Trainer(track=track, max_steps=count, seed=seed)
+    frames = []
+    episode = 1
+    while len(frames) < count:
+        trainer.run_episode(episode, on_frame=frames.append)
+        episode += 1
+    return [(frame.x, frame.y, frame.phi) for frame in frames[:count]]
+
+# 以 Agg 畫布 (不需要視窗) 建立與 gui 相同的 TrackRenderer
+def offscreen_renderer(track):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from renderer import TrackRenderer
+    fig = Figure(figsize=(5, 5))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    points = np.asarray(track.boundaries)
+    ax.plot(points[:, 0], points[:, 1], 'k-')
+    ax.set_aspect('equal')
+    renderer = TrackRenderer(canvas, ax, fps=None)
+    canvas.draw()
+    return renderer
+
+# 一條賽道上的所有 benchmark：模擬的每個部分、一個完整的無繪圖回合與 gui 繪製的一幀
+# independent=False 時略過 TRACK_INDEPENDENT 的項目
+def bench_track(track, calls=500, episodes=10, max_steps=300, seed=0, independent=True):
+    sensors = RaySensor(track)
+    xs, ys, phis = random_poses(track.boundaries, calls, seed)
+    thetas = np.random.default_rng(seed).uniform(-40, 40, calls)
+    start = track.start
+    car = Car(start[0], start[1], start[2], track, sensors)
+    lut_car = Car(start[0], start[1], start[2], track, sensors, Kinematics())
+    actions = np.random.default_rng(seed).integers(-45, 46, calls)
+    kinematics = lut_car.kinematics
+
+    def set_pose(i):
+        car.currentX, car.currentY, car.currentPHI, car.currentTHETA = xs[i], ys[i], phis[i], thetas[i]
+
+    def set_lut_pose(i):
+        lut_car.currentX, lut_car.currentY, lut_car.currentPHI, lut_car.currentTHETA = xs[i], ys[i], phis[i], int(actions[i])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = QLearn(epsilon=0.1, seed=seed)
+        model.initialize_q_table()
+        trainer = Trainer(track=track, max_steps=max_steps, seed=seed)
+    headings = np.radians(phis)
+    rng = np.random.default_rng(seed)
+    for state in np.ndindex(*model.state_shape):
+        model.temp_qtable.row(state)[:] = rng.normal(size=len(model.action_space))
+    states = [tuple(s) for s in rng.integers(0, 4, (calls, 3)).tolist()]
+    next_states = [tuple(s) for s in rng.integers(0, 4, (calls, 3)).tolist()]
+    q_actions = rng.integers(-45, 46, calls)
+
+    benches = {
+        'car.update_position': lambda: measure(lambda i: car.update_position(), calls, set_pose),
+        'car.update_position_lut': lambda: measure(lambda i: lut_car.update_position(), calls, set_lut_pose),
+        'kinematics.step': lambda: measure(lambda i: kinematics.step(xs[i], ys[i], headings[i], actions[i]), calls),
+        'kinematics.step_batch': lambda: measure(lambda i: kinematics.step_batch(xs, ys, headings, actions), 50),
+        'car.calculate_sensors': lambda: measure(lambda i: car.calculate_sensors(xs[i], ys[i], phis[i]), calls),
+        'car.check_collision': lambda: measure(lambda i: car.check_collision(), calls, set_pose),
+        'qlearn.choose_action': lambda: measure(lambda i: model.choose_action(states[i]), calls),
+        'qlearn.update_q_value': lambda: measure(lambda i: model.update_q_value(states[i], q_actions[i], 1, next_states[i]), calls),
+    }
+    results = {name: bench() for name, bench in benches.items() if independent or name not in TRACK_INDEPENDENT}
+
+    steps = []
+    results['episode'] = measure(lambda i: steps.append(trainer.run_episode(i + 1).steps), episodes, warmup=0)
+    results['episode']['steps_per_sec'] = sum(steps) / (results['episode']['mean_us'] * episodes / 1e6)
+
+    # 沿著連續的軌跡量測 (快取只在相鄰兩步之間有效)
+    path = trajectory_poses(track, calls, seed)
+    cached = CachedRaySensor(track)
+    results['sensors.trajectory'] = measure(lambda i: sensors.measure(*path[i]), calls)
+    results['sensors.cached_trajectory'] = measure(lambda i: cached.measure(*path[i]), calls)
+    results['sensors.cached_trajectory']['hit_rate'] = cached.hit_rate()
+
+    if independent:
+        renderer = offscreen_renderer(track)
+        results['render.frame'] = measure(lambda i: renderer.show_pose(xs[i], ys[i], phis[i], [10.0, 8.0, 8.0], 1, i), min(calls, 200))
+    return results
+
+# 整個 suite 跑 rounds 輪，同一個項目的各輪量測分散在不同時間，再由 summarize 合併
+def run_suite(tracks, calls=500, episodes=10, rounds=ROUNDS):
+    runs = {}
+    for r in range(rounds):
+        for i, (name, track) in enumerate(tracks):
+            print(f'Benchmarking {name} ({track.segment_count} segments), round {r + 1}/{rounds}...')
+            for bench, stats in bench_track(track, calls, episodes, independent=i == 0).items():
+                runs.setdefault(name, {}).setdefault(bench, []).append(stats)
+    results = {}
+    for name, benches in runs.items():
+        results[name] = {}
+        for bench, stats in benches.items():
+            times = np.vstack([s.pop('times') for s in stats])
+            results[name][bench] = dict(stats[-1], **summarize(times))
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'calls': calls,
+        'rounds': rounds,
+        'results': results,
+    }
+
+def print_suite(report):
+    for name, benches in report['results'].items():
+        print(name)
+        for bench, stats in benches.items():
+            extra = f'  {stats["steps_per_sec"]:9.0f} steps/s' if 'steps_per_sec' in stats else ''
+            extra += f'  hit rate {stats["hit_rate"] * 100:.1f}%' if 'hit_rate' in stats else ''
+            print(f'  {bench:<22} {stats["per_sec"]:12.0f} calls/s  p50 {stats["p50_us"]:10.2f} us  p90 {stats["p90_us"]:10.2f} us  p99 {stats["p99_us"]:10.2f} us{extra}')
+
+# 比較兩份結果：目前最快的 p50 (見 summarize) 比 baseline 各輪 p50 的中位數慢超過 threshold (比例) 即視為退步，回傳退步的項目
+# (只有雜訊時，目前最好的情況很少比 baseline 一般的情況還慢)
+def compare(baseline, current, threshold=0.25):
+    regressions = []
+    for name, benches in current['results'].items():
+        for bench, stats in benches.items():
+            base = baseline['results'].get(name, {}).get(bench)
+            if base is None:
+                continue
+            base_p50 = base.get('median_p50_us', base['p50_us'])
+            change = stats['p50_us'] / base_p50 - 1
+            flag = '  REGRESSION' if change > threshold else ''
+            print(f'{name:<10} {bench:<26} {base_p50:10.2f} -> {stats["p50_us"]:10.2f} us  {change * 100:+7.1f}%{flag}')
+            if change > threshold:
+                regressions.append((name, bench, change))
+    print(f'{len(regressions)} regression(s) above {threshold * 100:.0f}%')
+    return regressions
+
+# 比較向量化感測器與原始迴圈的結果與速度
+def bench_sensors(track, count=2000, repeat=3):
+    sensor = RaySensor(track)
+    track = track.boundaries
+    xs, ys, phis = random_poses(track, count)
+    poses = list(zip(xs.tolist(), ys.tolist(), phis.tolist()))
+
+    mismatches = 0
+    for x, y, phi in poses:
+        if sensor.measure(x, y, phi) != [float(d) for d in calculate_sensors_loop(track, x, y, phi)]:
+            mismatches += 1
+
+    def run_loop():
+        for x, y, phi in poses:
+            calculate_sensors_loop(track, x, y, phi)
+
+    def run_vectorized():
+        for x, y, phi in poses:
+            sensor.measure(x, y, phi)
+
+    def run_batch():
+        sensor.measure_batch(xs, ys, phis)
+
+    results = {}
+    for name, func in [('loop', run_loop), ('vectorized', run_vectorized), ('batch', run_batch)]:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        results[name] = best / count
+
+    print(f'Sensors: {len(track) - 1} segments (index {"on" if sensor.track.use_index else "off"}), {count} poses, {mismatches} mismatches against the loop')
+    for name, per_call in results.items():
+        print(f'  {name:<11} {per_call * 1e6:9.2f} us/call  ({results["loop"] / per_call:6.1f}x)')
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the car simulation')
+    parser.add_argument('--track', default='track.txt')
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--synthetic', type=int, nargs='*', default=None, help='also benchmark synthetic tracks with these segment counts')
+    parser.add_argument('--suite', action='store_true', help=f'run the full benchmark suite (synthetic tracks default to {SUITE_SYNTHETIC})')
+    parser.add_argument('--calls', type=int, default=500, help='timed calls per suite benchmark')
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help='suite repetitions; p50 uses the fastest round of each call')
+    parser.add_argument('--save', default=None, help='write suite results to this JSON file')
+    parser.add_argument('--compare', nargs='?', const=BASELINE_FILE, default=None, help=f'compare against a baseline JSON file (default {BASELINE_FILE})')
+    parser.add_argument('--current', default=None, help='with --compare: compare this stored result instead of running the suite')
+    parser.add_argument('--threshold', type=float, default=0.25, help='slowdown ratio of the current best p50 over the baseline median p50 flagged as a regression')
+    args = parser.parse_args()
+
+    if args.suite or args.compare:
+        if args.current:
+            with open(args.current, 'r') as f:
+                report = json.load(f)
+        else:
+            synthetic = SUITE_SYNTHETIC if args.synthetic is None else args.synthetic
+            tracks = [(os.path.basename(args.track), Track.from_file(args.track))]
+            tracks += [(f'synth{segments}', synthetic_course(segments)) for segments in synthetic]
+            report = run_suite(tracks, args.calls, rounds=args.rounds)
+            print_suite(report)
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(report, f, indent=1)
+            print(f'Results saved to {args.save}')
+        if args.compare:
+            with open(args.compare, 'r') as f:
+                baseline = json.load(f)
+            if compare(baseline, report, args.threshold):
+                sys.exit(1)
+    else:
+        track = Track.from_file(args.track)
+        bench_sensors(track, args.count)
+        for segments in args.synthetic or []:
+            bench_sensors(Track(synthetic_track(segments)), args.count)
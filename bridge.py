@@ -0,0 +1,59 @@
+import queue
+import threading
+from collections import deque
+
+# 訓練執行緒 (producer) 與 Tk 主迴圈 (consumer) 之間的橋接：
+# 訓練執行緒只把 Frame 放進有上限的佇列，從不直接操作 Tk 或 matplotlib；
+# 主迴圈以 container.after 定期取出並繪製，佇列滿時丟棄最舊的 frame，訓練永遠不會被 UI 阻塞
+class FrameBridge():
+    def __init__(self, root, consumer, maxsize=256, interval=15):
+        self.root = root
+        self.consumer = consumer          # consumer(frames)：在主執行緒中處理一批 frame
+        self.interval = interval          # 輪詢間隔 (ms)
+        self.frames = deque(maxlen=maxsize)
+        self.calls = queue.Queue()        # 需要在主執行緒執行的函式 (不會被丟棄)
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.running = False
+        self.after_id = None
+
+    # 由訓練執行緒呼叫，永不阻塞
+    def push(self, frame):
+        with self.lock:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+
+    # 由訓練執行緒呼叫：安排 func 在主執行緒執行 (例如 messagebox、按鈕狀態)
+    def call(self, func):
+        self.calls.put(func)
+
+    def start(self):
+        self.running = True
+        self.dropped = 0
+        if self.after_id is None:
+            self.after_id = self.root.after(self.interval, self.poll)
+
+    # 停止接收；剩下的 frame 與函式會在下一次輪詢時處理完
+    def stop(self):
+        self.running = False
+
+    def drain(self):
+        with self.lock:
+            frames = list(self.frames)
+            self.frames.clear()
+        return frames
+
+    def poll(self):
+        self.after_id = None
+        frames = self.drain()
+        if frames:
+            self.consumer(frames)
+        while True:
+            try:
+                func = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            func()
+        if self.running or self.frames or not self.calls.empty():
+            self.after_id = self.root.after(self.interval, self.poll)
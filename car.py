@@ -2,9 +2,12 @@ import math
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.path import Path
+from sensors import RaySensor
+from track import as_track
+from collision import check_collision
 
 class Car():
-    def __init__(self, initX, initY, phi, track):
+    def __init__(self, initX, initY, phi, track, sensors=None, kinematics=None):
         self.radius = 3             # the radius of the car
         self.currentX = initX       # the current X coordinate of the car
         self.currentY = initY       # the current Y coordinate of the car
@@ -16,9 +19,22 @@ class Car():
         self.left_distance = 8.4853    
         self.right_distance = 8.4853  
 
-        self.track = track
+        self.track = as_track(track)  # Track (預先編譯的牆段與空間索引)
+        # 向量化感測器 (可由外部傳入以便在多個回合間共用預先計算的牆段)
+        self.sensors = sensors if sensors is not None else RaySensor(self.track)
+        # kinematics.Kinematics：以查表計算運動學 (None 時使用下面的原始公式)
+        self.kinematics = kinematics
+        self.heading = math.radians(phi)  # φ (radians)
+        self.heading_phi = phi            # heading 對應的 currentPHI，currentPHI 被外部修改時重新換算
 
     def update_position(self):
+        if self.kinematics is not None:
+            if self.currentPHI != self.heading_phi:
+                self.heading = math.radians(self.currentPHI)
+            self.currentX, self.currentY, self.heading = self.kinematics.step(self.currentX, self.currentY, self.heading, self.currentTHETA)
+            self.currentPHI = self.heading_phi = math.degrees(self.heading)
+            self.front_distance, self.left_distance, self.right_distance = self.calculate_sensors(self.currentX, self.currentY, self.currentPHI)
+            return
         self.currentX = self.currentX + math.cos(math.radians(self.currentPHI + self.currentTHETA)) + (math.sin(math.radians(self.currentTHETA)) * math.sin(math.radians(self.currentPHI)))
         self.currentY = self.currentY + math.sin(math.radians(self.currentPHI + self.currentTHETA)) - (math.sin(math.radians(self.currentTHETA)) * math.cos(math.radians(self.currentPHI)))
         self.currentPHI = math.degrees(math.radians(self.currentPHI) - math.asin((2 * math.sin(math.radians(self.currentTHETA))) / (2 * self.radius)))
@@ -54,65 +70,13 @@ class Car():
     
     # 計算感測器到牆壁的距離
     def calculate_sensors(self, x, y, angle):
-        angle_rad = np.radians(angle)
-        
-        # 感測器角度(相對於車子方向)
-        angles = [0, 45, -45]  # front, left, right
-        distances = []
-        
-        for sensor_angle in angles:
-            # 計算感測器絕對角度
-            abs_angle = angle_rad + np.radians(sensor_angle)
-            
-            # 創建感測器射線
-            max_distance = 50
-            ray_points = np.array([
-                [x, y],
-                [x + max_distance * np.cos(abs_angle),
-                y + max_distance * np.sin(abs_angle)]
-            ])
-            
-            min_dist = max_distance
-            
-            # 檢查射線與每個牆段是否相交
-            for i in range(len(self.track) - 1):
-                wall = np.array([self.track[i], self.track[i + 1]])
-                
-                # 線段相交計算
-                x1, y1 = ray_points[0]
-                x2, y2 = ray_points[1]
-                x3, y3 = wall[0]
-                x4, y4 = wall[1]
-                
-                denominator = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
-                if denominator == 0:  # 若平行則跳過
-                    continue
-                    
-                t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / denominator
-                u = -((x1 - x2) * (y1 - y3) - (y1 - y2) * (x1 - x3)) / denominator
-                
-                if 0 <= t <= 1 and 0 <= u <= 1:  # 若相交則計算距離
-                    intersection_x = x1 + t * (x2 - x1)
-                    intersection_y = y1 + t * (y2 - y1)
-                    dist = np.sqrt((x - intersection_x)**2 + (y - intersection_y)**2)
-                    min_dist = min(min_dist, dist)
-            
-            distances.append(min_dist)
-        
-        return distances
+        return self.sensors.measure(x, y, angle)
     
     def check_collision(self):
-        # Iterate over each line segment in the track
-        for i in range(len(self.track) - 1):
-            start = np.array(self.track[i])
-            end = np.array(self.track[i + 1])
-            
-            # Check for intersection between the circle and the line segment
-            if self.circle_line_segment_intersect(start, end, np.array([self.currentX, self.currentY]), self.radius):
-                return True  # Collision detected
-        
-        return False  # No collision detected
+        # 一次測試車身圓形與附近所有牆段 (先以 bounding box 距離排除遠處的牆段)
+        return check_collision(self.track, self.currentX, self.currentY, self.radius)
     
+    # 單一牆段的原始版本，與 collision.circle_segment_intersect 語意相同
     def circle_line_segment_intersect(self, pt1, pt2, center, radius):
         # Vector from pt1 to pt2
         d = pt2 - pt1
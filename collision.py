@@ -0,0 +1,70 @@
+import numpy as np
+from track import as_track
+
+# 與 np.dot 相同的二維內積 (matmul 與 np.dot 使用相同的累加方式，結果逐位元一致)
+def _dot(u, v):
+    return (u[..., None, :] @ v[..., :, None])[..., 0, 0]
+
+# 圓與線段相交 (與 Car.circle_line_segment_intersect 相同的語意)：
+# 直線與圓的交點參數 t1 或 t2 落在 [0, 1] 時才算相交，線段完全在圓內不算
+def circle_segment_intersect(p0, direction, center, radius):
+    d = direction
+    f = p0 - center
+    a = _dot(d, d)
+    b = 2 * _dot(f, d)
+    c = _dot(f, f) - radius**2
+    # float_power 與純量 ** 2 一樣呼叫 pow()
+    discriminant = np.float_power(b, 2) - 4 * a * c
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.sqrt(discriminant)
+        t1 = (-b - root) / (2 * a)
+        t2 = (-b + root) / (2 * a)
+    return (discriminant >= 0) & (((t1 >= 0) & (t1 <= 1)) | ((t2 >= 0) & (t2 <= 1)))
+
+# broad phase：圓心到牆段 bounding box 的距離大於半徑時不可能相交
+def _near_bbox(track, segments, x, y, radius):
+    bbox_min, bbox_max = track.bbox_min, track.bbox_max
+    if segments is not track.all_segments:
+        bbox_min, bbox_max = bbox_min[segments], bbox_max[segments]
+    dx = np.maximum(np.maximum(bbox_min[..., 0] - x, x - bbox_max[..., 0]), 0)
+    dy = np.maximum(np.maximum(bbox_min[..., 1] - y, y - bbox_max[..., 1]), 0)
+    return dx * dx + dy * dy <= radius * radius
+
+# 單台車：一次測試附近所有牆段
+def check_collision(track, x, y, radius, cull=True):
+    track = as_track(track)
+    segments = track.segments_near(x, y, radius)
+    if cull:
+        segments = segments[_near_bbox(track, segments, x, y, radius)]
+    if segments.size == 0:
+        return False  # early-out：附近沒有牆段
+    hits = circle_segment_intersect(track.p0[segments], track.direction[segments], np.array([x, y]), radius)
+    return bool(hits.any())
+
+# 車隊：一次測試所有車子與所有 (附近的) 牆段，回傳 (N,) 布林陣列
+def check_collision_batch(track, xs, ys, radius, cull=True):
+    track = as_track(track)
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    collided = np.zeros(xs.shape, dtype=bool)
+    if xs.size == 0:
+        return collided
+    segments = track.segments_in_box(xs.min() - radius, ys.min() - radius, xs.max() + radius, ys.max() + radius)
+    if segments.size == 0:
+        return collided
+
+    if cull:
+        # 只對通過 broad phase 的 (車, 牆段) 組合做精確測試
+        near = _near_bbox(track, segments[None, :], xs[:, None], ys[:, None], radius)
+        cars, pairs = np.nonzero(near)
+        if cars.size == 0:
+            return collided
+        seg = segments[pairs]
+        centers = np.stack([xs[cars], ys[cars]], axis=1)
+        hits = circle_segment_intersect(track.p0[seg], track.direction[seg], centers, radius)
+        collided[cars[hits]] = True
+        return collided
+
+    centers = np.stack([xs, ys], axis=1)[:, None, :]
+    hits = circle_segment_intersect(track.p0[segments][None, :, :], track.direction[segments][None, :, :], centers, radius)
+    return hits.any(axis=1)
@@ -0,0 +1,44 @@
+import numpy as np
+
+# 固定容量的經驗回放 ring buffer：轉移存放在預先配置的 NumPy 陣列中，滿了之後覆寫最舊的轉移
+class ReplayBuffer():
+    def __init__(self, capacity, state_dims=3, seed=None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)  # 取樣用的亂數產生器 (可傳入 learner 的 Generator)
+        self.states = np.zeros((capacity, state_dims), dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int32)  # 動作 (轉向角度)
+        self.rewards = np.zeros(capacity)
+        self.next_states = np.zeros((capacity, state_dims), dtype=np.int32)
+        self.dones = np.zeros(capacity, dtype=bool)        # 撞牆或抵達終點
+        self.position = 0  # 下一筆寫入的位置
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    # 一次加入多筆轉移 (車隊)，超過容量時只保留最後 capacity 筆
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        count = min(len(actions), self.capacity)
+        idx = (self.position + np.arange(count)) % self.capacity
+        self.states[idx] = np.asarray(states)[-count:]
+        self.actions[idx] = np.asarray(actions)[-count:]
+        self.rewards[idx] = np.asarray(rewards)[-count:]
+        self.next_states[idx] = np.asarray(next_states)[-count:]
+        self.dones[idx] = np.asarray(dones)[-count:]
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    # 均勻取樣 batch_size 筆 (可重複)，回傳 (states, actions, rewards, next_states, dones)
+    def sample(self, batch_size):
+        idx = self.rng.integers(0, self.size, batch_size)
+        return self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx], self.dones[idx]
@@ -0,0 +1,53 @@
+import numpy as np
+from sensors import RaySensor
+from track import as_track
+from collision import check_collision_batch
+from kinematics import Kinematics
+
+# Structure-of-arrays 車隊：N 台車的狀態存放在 NumPy 陣列中，一次向量化更新全部車子
+class CarBatch():
+    def __init__(self, count, initX, initY, phi, track, sensors=None, radius=3, kinematics=None):
+        self.count = count
+        self.radius = radius
+        self.kinematics = kinematics if kinematics is not None else Kinematics(radius=radius)
+        self.init_pose = tuple(np.broadcast_to(np.asarray(v, dtype=float), (count,)) for v in (initX, initY, phi))  # 可為每台車不同的起點
+        self.track = as_track(track)
+        self.sensors = sensors if sensors is not None else RaySensor(self.track)
+
+        self.X = np.empty(count)
+        self.Y = np.empty(count)
+        self.PHI = np.empty(count)       # φ (degrees)
+        self.HEADING = np.empty(count)   # φ (radians)，運動學內部使用
+        self.THETA = np.zeros(count)     # θ (degrees)
+        self.distances = np.empty((count, 3))  # front, left, right
+        self.active = np.ones(count, dtype=bool)  # 尚未抵達終點或撞牆的車子
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.count, dtype=bool)
+        self.X[mask] = self.init_pose[0][mask]
+        self.Y[mask] = self.init_pose[1][mask]
+        self.PHI[mask] = self.init_pose[2][mask]
+        self.HEADING[mask] = np.radians(self.PHI[mask])
+        self.THETA[mask] = 0
+        self.distances[mask] = [22.0, 8.4853, 8.4853]  # 與 Car 相同的初始感測器距離
+        self.active[mask] = True
+
+    # 與 Car.update_position 相同的運動學模型 (以 kinematics 查表計算)，只更新 active 的車子
+    def update_position(self, thetas):
+        idx = np.flatnonzero(self.active)
+        if idx.size == 0:
+            return
+        self.THETA[idx] = np.asarray(thetas, dtype=float)[idx]
+        self.X[idx], self.Y[idx], self.HEADING[idx] = self.kinematics.step_batch(self.X[idx], self.Y[idx], self.HEADING[idx], self.THETA[idx])
+        self.PHI[idx] = np.degrees(self.HEADING[idx])
+        self.distances[idx] = self.sensors.measure_batch(self.X[idx], self.Y[idx], self.PHI[idx])
+
+    # 同 Car.check_collision：車身圓形與任一牆段相交即為碰撞，回傳 (N,) 布林陣列
+    def check_collision(self):
+        return check_collision_batch(self.track, self.X, self.Y, self.radius)
+
+    def step(self, thetas):
+        self.update_position(thetas)
+        return self.distances, self.check_collision()
@@ -1,5 +1,3 @@
-import os
-import sys
 import numpy as np
 import tkinter as tk
 from tkinter import messagebox
@@ -9,6 +7,14 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from qlearn import QLearn
 from car import Car
+from sensors import RaySensor
+from trainer import Trainer, DisplayPolicy, compute_trajectory
+from track import Track
+from renderer import TrackRenderer
+from bridge import FrameBridge
+from replay import ReplayPlayer
+from recorder import EpisodeRecorder, TrajectoryLog
+from profiler import Profiler
 import time
 import threading
 
@@ -16,17 +22,29 @@ def str2float(strlist):
     return [round(float(i)) if float(i).is_integer() else float(i) for i in strlist]
 
 class gui():
+    LOG_DIR = 'trajectory_log'  # 訓練軌跡記錄的資料夾
+    STATS_INTERVAL = 500        # 效能統計面板的更新間隔 (ms)
+
+    # 訓練時的顯示策略 (見 trainer.DisplayPolicy)
+    DISPLAY_MODES = {
+        'Every N episodes': 'every',
+        'Best episodes only': 'best',
+        'Final replay only': 'final',
+    }
+
     def __init__(self, app_name, app_width, app_height):
         self.training_thread = None
 
         self.track = []
+        self.sensors = None
         self.totalreward_list = []
         self.epsilon_list = []
         self.path_result = []
         self.ax = None
-        self.car_artists = []
-        self.path_artists = []
-        self.position_artists = []
+        self.renderer = None
+        self.drawn_episode = None
+        self.pending_replay = None  # 訓練中等待播放的回合 (只保留最新的一個)
+        self.profiler = None
 
         self.episode = 0
         self.lr = 0
@@ -62,6 +80,43 @@ class gui():
         self.discount_factor_label = tk.Label(self.setting_frame, text='Discount Factor:', bg='white')
         self.discount_factor_box = tk.Spinbox(self.setting_frame, increment=0.01, from_=0.0, to=1, width=5, bg='white', textvariable=tk.StringVar(value='0.8'))
 
+        self.fps_label = tk.Label(self.setting_frame, text='Render FPS:', bg='white')
+        self.fps_box = tk.Spinbox(self.setting_frame, increment=5, from_=1, to=240, width=5, bg='white', textvariable=tk.StringVar(value='30'))
+
+        self.display_label = tk.Label(self.setting_frame, text='Display:', bg='white')
+        self.display_box = ttk.Combobox(self.setting_frame, values=list(self.DISPLAY_MODES), width=18, state='readonly')
+        self.display_box.current(0)
+
+        self.display_every_label = tk.Label(self.setting_frame, text='Render Every N:', bg='white')
+        self.display_every_box = tk.Spinbox(self.setting_frame, increment=1, from_=1, to=100000, width=5, bg='white', textvariable=tk.StringVar(value='1'))
+
+        self.speed_label = tk.Label(self.setting_frame, text='Replay Speed:', bg='white')
+        self.speed_box = tk.Scale(self.setting_frame, from_=0.25, to=10, resolution=0.25, orient='horizontal', length=120, bg='white', highlightthickness=0, command=lambda value: self.player.set_speed(value))
+        self.speed_box.set(1)
+
+        self.scrub_label = tk.Label(self.setting_frame, text='Replay Step:', bg='white')
+        self.scrub_box = tk.Scale(self.setting_frame, from_=0, to=0, orient='horizontal', length=120, bg='white', highlightthickness=0)
+        # 只回應使用者拖曳 (播放時程式更新拖曳條的值不會觸發 seek)
+        self.scrub_box.bind('<B1-Motion>', lambda event: self.player.seek(self.scrub_box.get()))
+        self.scrub_box.bind('<ButtonRelease-1>', lambda event: self.player.seek(self.scrub_box.get()))
+
+        self.record_var = tk.BooleanVar(value=False)
+        self.record_box = tk.Checkbutton(self.setting_frame, text='Record Log', variable=self.record_var, bg='white')
+
+        self.profile_var = tk.BooleanVar(value=False)
+        self.profile_box = tk.Checkbutton(self.setting_frame, text='Show Stats', variable=self.profile_var, bg='white')
+        self.stats_label = tk.Label(self.setting_frame, text='', bg='white', justify='left', anchor='w', font=('Courier', 8))
+
+        self.view_episode_box = tk.Spinbox(self.setting_frame, increment=1, from_=1, to=10**9, width=5, bg='white', textvariable=tk.StringVar(value='1'))
+        self.view_episode_btn = tk.Button(
+            master=self.setting_frame,
+            command=self.view_log_episode,
+            height=2,
+            width=10,
+            text="View Episode",
+            highlightbackground='white'
+        )
+
         self.train_btn = tk.Button(master = self.setting_frame,  
                      command = self.train, 
                      height = 2,  
@@ -87,6 +142,16 @@ class gui():
             highlightbackground='white'
         )
 
+        self.cancel_btn = tk.Button(
+            master=self.setting_frame,  
+            command=lambda: self.player.cancel(), 
+            height=2,  
+            width=10, 
+            text="Stop Replay",
+            state='disabled',
+            highlightbackground='white'
+        )
+
         # components placing
         self.setting_frame.place(x=5, y=100)
         self.graph_frame.place(x=270, y=100)
@@ -102,11 +167,29 @@ class gui():
         self.episode_box.grid(row=2, column=1, padx=5, pady=5, sticky='w')
         self.lrn_rate_label.grid(row=3, column=0, padx=5, pady=5, sticky='w')
         self.lrn_rate_box.grid(row=3, column=1, padx=5, pady=5, sticky='w')
+        self.fps_label.grid(row=6, column=0, padx=5, pady=5, sticky='w')
+        self.fps_box.grid(row=6, column=1, padx=5, pady=5, sticky='w')
+        self.display_label.grid(row=7, column=0, padx=5, pady=5, sticky='w')
+        self.display_box.grid(row=7, column=1, padx=5, pady=5, sticky='w')
+        self.display_every_label.grid(row=8, column=0, padx=5, pady=5, sticky='w')
+        self.display_every_box.grid(row=8, column=1, padx=5, pady=5, sticky='w')
+        self.speed_label.grid(row=9, column=0, padx=5, pady=5, sticky='w')
+        self.speed_box.grid(row=9, column=1, padx=5, pady=5, sticky='w')
+        self.scrub_label.grid(row=10, column=0, padx=5, pady=5, sticky='w')
+        self.scrub_box.grid(row=10, column=1, padx=5, pady=5, sticky='w')
+        self.cancel_btn.grid(row=5, column=1, padx=5, pady=5, sticky='w')
+        self.record_box.grid(row=11, column=0, padx=5, pady=5, sticky='w')
+        self.profile_box.grid(row=11, column=1, padx=5, pady=5, sticky='w')
+        self.stats_label.grid(row=13, column=0, columnspan=2, padx=5, pady=5, sticky='w')
+        self.view_episode_btn.grid(row=12, column=0, padx=5, pady=5, sticky='w')
+        self.view_episode_box.grid(row=12, column=1, padx=5, pady=5, sticky='w')
         self.train_btn.grid(row=4, column=0, padx=5, pady=5, sticky='w')
         self.run_success_btn.grid(row=4, column=1, padx=5, pady=5, sticky='w')
         self.run_default_btn.grid(row=5, column=0, padx=5, pady=5, sticky='w')
 
         self.draw_car_track() # Draw track
+        self.bridge = FrameBridge(self.container, self.draw_frames)
+        self.player = ReplayPlayer(self.container, self.renderer, on_position=self.scrub_box.set)
         
     def save(self):
         if self.figure == None:
@@ -156,196 +239,153 @@ class gui():
             return False
         return True
     
+    def fps_validation(self):
+        fps = float(self.fps_box.get())
+        if fps <= 0:
+            messagebox.showerror('showerror', 'Render FPS must be greater than 0')
+            self.fps_box.delete(0, tk.END)
+            self.fps_box.insert(0, '30')
+            return False
+        self.renderer.fps = fps
+        return True
+    
+    def display_mode(self):
+        return self.DISPLAY_MODES.get(self.display_box.get(), 'every')
+
+    def display_every_validation(self):
+        every = int(self.display_every_box.get())
+        if every <= 0:
+            messagebox.showerror('showerror', 'Render Every N must be greater than 0')
+            self.display_every_box.delete(0, tk.END)
+            self.display_every_box.insert(0, '1')
+            return False
+        return True
+    
     def open(self):
         self.container.mainloop()
 
     def train(self):
+        self.pending_replay = None
+        self.player.cancel()
         self.totalreward_list = []
-        self.clear_car_artists()
-        self.clear_path_artists()
+        self.renderer.reset_path()
         if self.totalreward_graph.figure:
             self.totalreward_graph.figure.clf()
             self.totalreward_graph.draw_idle()
 
         # Inputs validation
-        if self.discount_factor_validation() == False or self.lrn_validation() == False or self.episode_validation() == False or self.epsilon_validation() == False:
+        if self.discount_factor_validation() == False or self.lrn_validation() == False or self.episode_validation() == False or self.epsilon_validation() == False or self.fps_validation() == False or self.display_every_validation() == False:
             return
         
         print('===== Start Training ====== ')
+        self.set_buttons_state('disabled')
+        self.episode = int(self.episode_box.get())
+
+        # 初始化Q-Learning模型 (訓練迴圈與 reward 計算與 headless Trainer 共用)
+        # 所有 Tk 元件的讀取都在主執行緒完成，訓練執行緒只透過 self.bridge 與 UI 溝通
+        trainer = Trainer(
+            lrn_rate=float(self.lrn_rate_box.get()),
+            gamma=float(self.discount_factor_box.get()),
+            epsilon=float(self.epsilon_box.get()),
+            discount=float(self.discount_factor_box.get()),
+            track=self.track,
+            recorder=EpisodeRecorder(self.LOG_DIR) if self.record_var.get() else None,
+            profiler=Profiler() if self.profile_var.get() else None,
+        )
+        self.model = trainer.model
+        self.profiler = trainer.profiler
+        display = DisplayPolicy(self.display_mode(), int(self.display_every_box.get()))
+        self.drawn_episode = None
+
         def _train_loop():
             try:
-                self.train_btn.config(state='disabled')
-                self.run_success_btn.config(state='disabled')
-                self.run_default_btn.config(state='disabled')
-                self.episode = int(self.episode_box.get())
-                
-                # 初始化Q-Learning模型
-                self.model = QLearn(
-                    lrn_rate=float(self.lrn_rate_box.get()),
-                    gamma=float(self.discount_factor_box.get()),
-                    epsilon=float(self.epsilon_box.get()),
-                    discount=float(self.discount_factor_box.get()),
-                )
-                self.model.initialize_q_table()
-                best_reward = 0
-                for i in range(self.episode):
-                    total_reward = 0
-                    steps = 0
-                    reward = 0
-                    flag = True
-                    
-                    self.car = Car(0, 0, 90, self.track)  # 重置車輛
-                    self.clear_car_artists()
-                    self.clear_path_artists()
-                    state = self.model.discretize_state(self.car.get_distances())
-                    
-                    # Keep update the car's position until it reaches the goal or hit the wall
-                    steps = 0
-                    while flag:
-                        action = self.model.choose_action(state)
-                        self.car.set_currentTHETA(action)
-                        self.car.update_position()
-                        
-                        # 獲取新狀態和獎勵
-                        next_state = self.model.discretize_state(self.car.get_distances())
-                        if self.check_finish(i):
-                            reward = 10000
-                            self.model.epsilon *= 0.5  # 衰減探索率
-                            self.model.update_qtable()  # 儲存最好的 Q Table
-                            flag = False
-                        elif self.car.check_collision():
-                            reward = -10
-                            flag = False
-                        else:
-                            # 根據感測器最小距離給予動態獎勵
-                            front = self.car.get_distances()[0]
-                            left = self.car.get_distances()[1]
-                            right = self.car.get_distances()[2]
-                            min_dist = min(left, right)
-
-                            if front > min_dist: # 代表車子目前比較屬於直線車道，如果前方感測器過於靠近障礙物，則給予懲罰
-                                if front < 5:
-                                    reward = -5
-                                elif front < 10:
-                                    reward = -1
-                                else: 
-                                    reward = 1
-                            else: # 代表車子目前比較屬於彎道，注意左右感測器的距離
-                                if min_dist < 5:
-                                    reward = -5
-                                elif min_dist < 12:
-                                    reward = -1
-                                else:
-                                    reward = 1
-                                
-                            # 根據行駛步數給予獎勵
-                            if steps > 50: # 通常在50步內會到達第二個轉角
-                                if front > 10: # 如果前方感測器距離較遠，代表轉向較為成功
-                                    reward = 20
-                                else:
-                                    reward = 5
-                            elif steps > 30:
-                                reward = 2
-
-                        # 更新Q值
-                        self.model.update_q_value(state, action, reward, next_state)                            
-                        state = next_state
-                        total_reward += reward
-                        steps += 1
-                        distances = self.car.get_distances()
-                        # Draw sensor arrows and car
-                        self.clear_car_artists()
-                        self.clear_position_artists()
-                        self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Front', self.car.currentX, self.car.currentY, self.car.currentPHI, distances[0]))
-                        self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Left', self.car.currentX, self.car.currentY, self.car.currentPHI + 45, distances[1]))
-                        self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Right', self.car.currentX, self.car.currentY, self.car.currentPHI - 45, distances[2]))
-                        car, text, center = self.car.draw_car(self.ax, i+1, steps)
-                        self.position_artists.append(car)
-                        self.position_artists.append(text)
-                        self.path_artists.append(center)
-                        # Update canvas
-                        self.track_graph.get_tk_widget().update()
-                        self.track_graph.draw()
-                    print(f'Stop at Step {steps}. Episode {i+1}/{self.episode} finished. Total Reward in this episode: {total_reward}')
-                    self.totalreward_list.append(total_reward)
-                    self.epsilon_list.append(self.model.epsilon)
-                    if total_reward > best_reward:
-                        best_reward = total_reward
-                        self.model.epsilon *= self.model.decay  # 衰減探索率
-                        self.model.update_qtable()  # 儲存最好的 Q Table
+                def report(stats):
+                    print(f'Stop at Step {stats.steps}. Episode {stats.episode}/{self.episode} finished. Total Reward in this episode: {stats.total_reward}')
+                    if stats.finished:
+                        self.bridge.call(lambda: messagebox.showinfo('Success', f'Car has reached the finish at Epoch {stats.episode}!'))
+                    self.totalreward_list.append(stats.total_reward)
+                    self.epsilon_list.append(stats.epsilon)
+                    if stats.improved:
                         print(f'Epsilon: {self.model.epsilon:.4f}')
+
+                # 即時的 frame 經由 bridge (可丟棄)；錄下的整個回合經由 bridge.call 交給 ReplayPlayer (不會丟棄)
+                trainer.train(self.episode, callback=report, display=display, on_frame=self.bridge.push,
+                              on_replay=lambda frames: self.bridge.call(lambda: self.queue_replay(frames)))
                 print(f'Total Reward: {self.totalreward_list}')
                 print('===== Training Done ====== ')
+                if trainer.profiler is not None:
+                    print(trainer.profiler.summary())
                 self.model.save_q_table("last_qtable.npy")
-                self.draw_totalreward_graph()
+                self.bridge.call(self.draw_totalreward_graph)
 
             except Exception as e:
                 print(f'Error: {e}')
                 return None
             finally:
+                if trainer.recorder is not None:
+                    trainer.recorder.close()
                 # 更新GUI状态
-                self.container.after(0, lambda: [
-                    self.train_btn.config(state='normal'),
-                    self.run_success_btn.config(state='normal'),
-                    self.run_default_btn.config(state='normal')
-                ])
+                self.bridge.call(lambda: self.set_buttons_state('normal'))
+                self.bridge.call(self.update_stats)
+                self.bridge.stop()
+        self.bridge.start()
         self.training_thread = threading.Thread(target=_train_loop)
         self.training_thread.start()
+        self.stats_label.config(text='')
+        self.update_stats()
+
+    # 在主執行緒中繪製訓練執行緒送來的 frame (由 self.bridge 呼叫)
+    def draw_frames(self, frames):
+        prof = self.profiler
+        if prof is not None:
+            t = time.perf_counter()
+        for frame in frames:
+            if frame.episode != self.drawn_episode:  # 新回合開始，清除路徑
+                self.drawn_episode = frame.episode
+                self.renderer.reset_path()
+            # Draw sensor arrows and car (只在到達幀率間隔或回合結束時重繪)
+            self.renderer.update_frame(frame)
+        if prof is not None:
+            prof.lap('draw', t)
+
+    # 訓練中 'best' / 'final' 模式錄下的回合：以 ReplayPlayer 逐步播放，正在播放時只保留最新的一個回合
+    def queue_replay(self, frames):
+        if self.player.playing():
+            self.pending_replay = frames
+        else:
+            self.play_recorded(frames)
 
-    def check_finish(self, epoch=None):
-        if 18 <= self.car.currentX <= 30 and 37 <= self.car.currentY:
-            if epoch == '-':
-                self.container.after(0, lambda: messagebox.showinfo('Success', 'Car has reached the finish!'))
-            elif epoch is not None:
-                self.container.after(0, lambda: messagebox.showinfo('Success', f'Car has reached the finish at Epoch {epoch+1}!'))
-            
-            return True
-        return False
-
-    def clear_car_artists(self):
-        if len(self.car_artists) > 0:
-            for artist in self.car_artists:
-                if artist is not None:
-                    artist.remove()
-            self.car_artists = []
-
-    def clear_position_artists(self):
-        if len(self.position_artists) > 0:
-            for artist in self.position_artists:
-                if artist is not None:
-                    artist.remove()
-            self.position_artists = []
-
-    def clear_path_artists(self):
-        if len(self.path_artists) > 0:
-            for artist in self.path_artists:
-                if artist is not None:
-                    artist.remove()
-            self.path_artists = []
+    def play_recorded(self, frames):
+        def done(cancelled):
+            frames, self.pending_replay = self.pending_replay, None
+            if frames is not None and not cancelled:
+                self.play_recorded(frames)
 
-    def draw_car_track(self):
-        if hasattr(sys, '_MEIPASS'):
-            trackFile = os.path.join(sys._MEIPASS, "track.txt")
-        else:
-            trackFile = os.path.join(os.path.abspath("."), "track.txt")
+        self.scrub_box.config(to=max(len(frames) - 1, 0))
+        self.player.play(frames, self.speed_box.get(), done)
 
-        with open(trackFile, 'r') as f:
-            lines = f.readlines()
-        
-        # “起點座標”及“起點與水平線之的夾角”
-        start_x, start_y, phi = [float(coord) for coord in lines[0].strip().split(',')]
+    # 訓練中每 STATS_INTERVAL ms 更新一次效能統計面板
+    def update_stats(self):
+        if self.profiler is None:
+            return
+        self.profiler.counters['dropped frames'] = self.bridge.dropped
+        self.stats_label.config(text=self.profiler.summary())
+        if self.training_thread is not None and self.training_thread.is_alive():
+            self.container.after(self.STATS_INTERVAL, self.update_stats)
 
-        # “終點區域左上角座標”及“終點區域右下角座標”
-        finish_top_left = [float(coord) for coord in lines[1].strip().split(',')]
-        finish_bottom_right = [float(coord) for coord in lines[2].strip().split(',')]
-        
-        # “賽道邊界”
-        boundaries = [[float(coord) for coord in line.strip().split(',')] for line in lines[3:]]
+    def draw_car_track(self):
+        # “起點座標”、“終點區域”及“賽道邊界”
+        track = Track.from_file("track.txt")
+        start_x, start_y, phi = track.start
+        finish_top_left = track.finish_top_left
+        finish_bottom_right = track.finish_bottom_right
+        boundaries = track.boundaries
         
         # Extract x and y coordinates from boundaries
         boundary_x, boundary_y = zip(*boundaries)
-        self.track = boundaries
-        self.car = Car(start_x, start_y, phi, boundaries)
+        self.track = track
+        self.sensors = RaySensor(track)
+        self.car = Car(start_x, start_y, phi, track, self.sensors)
 
         # print('boundaries', boundaries)
         self.figure = plt.Figure(figsize=(15, 15), dpi=100)
@@ -378,11 +418,6 @@ class gui():
                         square_width, square_height,
                         edgecolor=color, facecolor=color))
 
-        # Draw starting position and direction arrow
-        car, text, path = self.car.draw_car(self.ax, "-", '-')
-        self.position_artists.append(car)
-        self.position_artists.append(text)
-        self.path_artists.append(path)
         self.ax.plot(start_x, start_y, 'ro', label="Start Position")
         self.ax.scatter([], [], color='darkgrey', label='Path')
         self.ax.scatter([], [], marker=r'$\rightarrow$', label=f"Front Sensor", color='red', s=100)
@@ -398,7 +433,11 @@ class gui():
 
         # Show plot
         self.track_graph.figure = self.figure
-        self.track_graph.draw()
+        self.figure.set_canvas(self.track_graph)
+
+        # Draw starting position (靜態賽道快取為背景，之後只以 blitting 更新車子)
+        self.renderer = TrackRenderer(self.track_graph, self.ax, self.car.radius)
+        self.renderer.update(self.car, "-", '-', force=True)
             
     def draw_totalreward_graph(self):
         if not self.totalreward_list:
@@ -432,128 +471,62 @@ class gui():
         self.totalreward_graph.draw()
             
     def run_success(self):
-        # 清除舊的繪圖元素
-        self.clear_car_artists()
-        self.clear_path_artists()
-
-        self.car = Car(0, 0, 90, self.track)  # 重置車輛
-        self.train_btn.config(state='disabled')
-        self.run_success_btn.config(state='disabled')
-        self.run_default_btn.config(state='disabled')
-
-        # 加載最佳 Q-table
-        self.model = QLearn()
-        self.model.load_q_table("last_qtable.npy")
-            
-        try:
-            done = False
-            steps = 0
-            while not done:
-                # 獲取當前狀態
-                distances = self.car.get_distances()
-                state = self.model.discretize_state(distances)
-                    
-                # 選擇最佳動作
-                action = max(self.model.q_table[state], key=self.model.q_table[state].get)
-                self.car.set_currentTHETA(action)
-                self.car.update_position()
-                distances = self.car.get_distances()
-                time.sleep(0.01)
-                # Draw sensor arrows and car
-                self.clear_car_artists()
-                self.clear_position_artists()
-                self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Front', self.car.currentX, self.car.currentY, self.car.currentPHI, distances[0]))
-                self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Left', self.car.currentX, self.car.currentY, self.car.currentPHI + 45, distances[1]))
-                self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Right', self.car.currentX, self.car.currentY, self.car.currentPHI - 45, distances[2]))
-                    
-                car, text, center = self.car.draw_car(self.ax, "-", "-")
-                self.position_artists.append(car)
-                self.position_artists.append(text)
-                self.path_artists.append(center)
-    
-                # Update canvas
-                self.track_graph.get_tk_widget().update()
-                self.track_graph.draw()
-                    
-                # 檢查終點或碰撞
-                if self.check_finish('-'):
-                    done = True
-                elif self.car.check_collision():
-                    messagebox.showinfo("Collision", "Car hit the wall!")
-                    done = True
-                    
-                steps += 1
-            
-            self.train_btn.config(state='normal')
-            self.run_success_btn.config(state='normal')
-            self.run_default_btn.config(state='normal')
-            
-        except Exception as e:
-            print(f"Error in run_success: {e}")
-            self.train_btn.config(state='normal')
-            self.run_success_btn.config(state='normal')
-            self.run_default_btn.config(state='normal')
+        self.replay("last_qtable.npy")
 
     def run_default(self):
-        # 清除舊的繪圖元素
-        self.clear_car_artists()
-        self.clear_path_artists()
+        self.replay("default_qtable.npy")
+
+    def set_buttons_state(self, state):
+        self.train_btn.config(state=state)
+        self.run_success_btn.config(state=state)
+        self.run_default_btn.config(state=state)
+        self.view_episode_btn.config(state=state)
 
-        self.car = Car(0, 0, 90, self.track)  # 重置車輛
-        self.train_btn.config(state='disabled')
-        self.run_success_btn.config(state='disabled')
-        self.run_default_btn.config(state='disabled')
+    # 從記憶體映射的軌跡記錄中直接取出某個回合並重播 (不需重新模擬)
+    def view_log_episode(self):
+        if self.fps_validation() == False:
+            return
+        self.player.cancel()
+        try:
+            episode = int(self.view_episode_box.get())
+            frames = TrajectoryLog(self.LOG_DIR).frames(episode)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Error in view_log_episode: {e}")
+            messagebox.showerror('showerror', f'Cannot load episode {self.view_episode_box.get()} from {self.LOG_DIR}')
+            return
+        self.play_frames(frames, None)
+
+    def play_frames(self, frames, outcome):
+        def done(cancelled):
+            self.set_buttons_state('normal')
+            self.cancel_btn.config(state='disabled')
+            if cancelled:
+                return
+            # 檢查終點或碰撞
+            if outcome == 'finish':
+                messagebox.showinfo('Success', 'Car has reached the finish!')
+            elif outcome == 'collision':
+                messagebox.showinfo("Collision", "Car hit the wall!")
+
+        self.set_buttons_state('disabled')
+        self.cancel_btn.config(state='normal')
+        self.scrub_box.config(to=max(len(frames) - 1, 0))
+        self.player.play(frames, self.speed_box.get(), done)
+
+    # 先以無繪圖方式算出整條軌跡，再由 ReplayPlayer 以 after 排程播放，不阻塞主迴圈
+    def replay(self, filename):
+        if self.fps_validation() == False:
+            return
+        self.player.cancel()
 
         # 加載最佳 Q-table
         self.model = QLearn()
-        self.model.load_q_table("default_qtable.npy")
-            
         try:
-            done = False
-            steps = 0
-            while not done:
-                # 獲取當前狀態
-                distances = self.car.get_distances()
-                state = self.model.discretize_state(distances)
-                    
-                # 選擇最佳動作
-                action = max(self.model.q_table[state], key=self.model.q_table[state].get)
-                self.car.set_currentTHETA(action)
-                self.car.update_position()
-                distances = self.car.get_distances()
-                time.sleep(0.01)
-                # Draw sensor arrows and car
-                self.clear_car_artists()
-                self.clear_position_artists()
-                self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Front', self.car.currentX, self.car.currentY, self.car.currentPHI, distances[0]))
-                self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Left', self.car.currentX, self.car.currentY, self.car.currentPHI + 45, distances[1]))
-                self.car_artists.append(self.car.draw_sensor_distance_arrow(self.ax, 'Right', self.car.currentX, self.car.currentY, self.car.currentPHI - 45, distances[2]))
-                    
-                car, text, center = self.car.draw_car(self.ax, "-", "-")
-                self.position_artists.append(car)
-                self.position_artists.append(text)
-                self.path_artists.append(center)
-    
-                # Update canvas
-                self.track_graph.get_tk_widget().update()
-                self.track_graph.draw()
-                    
-                # 檢查終點或碰撞
-                if self.check_finish('-'):
-                    done = True
-                elif self.car.check_collision():
-                    messagebox.showinfo("Collision", "Car hit the wall!")
-                    done = True
-                    
-                steps += 1
-                
-            self.train_btn.config(state='normal')
-            self.run_success_btn.config(state='normal')
-            self.run_default_btn.config(state='normal')
-
-            
+            self.model.load_q_table(filename)
+            frames, outcome = compute_trajectory(self.track, self.model, sensors=self.sensors)
         except Exception as e:
-            print(f"Error in run_: {e}")
-            self.train_btn.config(state='normal')
-            self.run_success_btn.config(state='normal')
-            self.run_default_btn.config(state='normal')
\ No newline at end of file
+            print(f"Error in replay: {e}")
+            messagebox.showerror('showerror', f'Cannot replay {filename}')
+            return
+
+        self.play_frames(frames, outcome)
@@ -0,0 +1,37 @@
+import math
+import numpy as np
+
+# 預先計算每個轉向角 θ (整數角度) 的運動學項，heading 在內部以弧度表示
+# Car.update_position 的模型可化簡為 (φ 為弧度)：
+#   x' = x + cos θ · cos φ
+#   y' = y + cos θ · sin φ
+#   φ' = φ - asin(sin θ / r)
+# 因此每一步只需要 cos φ、sin φ 兩次三角函數，其餘由查表取得；結果與原公式在浮點誤差範圍內一致
+class Kinematics():
+    def __init__(self, action_space=None, radius=3):
+        if action_space is None:
+            action_space = np.arange(-45, 46, 1)
+        self.radius = radius
+        self.offset = int(action_space[0])
+        theta = np.radians(np.asarray(action_space, dtype=float))
+        self.cos_theta = np.cos(theta)
+        self.turn = np.arcsin(np.sin(theta) / radius)   # 每一步 heading 減少的弧度
+        self.cos_list = self.cos_theta.tolist()          # 單台車查表用
+        self.turn_list = self.turn.tolist()
+
+    # 單台車：theta 為整數角度 (動作)，回傳 (x, y, heading)
+    def step(self, x, y, heading, theta):
+        i = int(theta) - self.offset
+        if i != theta - self.offset or not 0 <= i < len(self.cos_list):
+            # 不在表中的角度直接計算
+            rad = math.radians(theta)
+            c, turn = math.cos(rad), math.asin(math.sin(rad) / self.radius)
+        else:
+            c, turn = self.cos_list[i], self.turn_list[i]
+        return x + c * math.cos(heading), y + c * math.sin(heading), heading - turn
+
+    # 多台車：thetas 為整數角度陣列，回傳新的 (xs, ys, headings)
+    def step_batch(self, xs, ys, headings, thetas):
+        i = np.asarray(thetas).astype(np.intp) - self.offset
+        c = self.cos_theta[i]
+        return xs + c * np.cos(headings), ys + c * np.sin(headings), headings - self.turn[i]
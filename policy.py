@@ -0,0 +1,36 @@
+import bisect
+import numpy as np
+
+# 由凍結的 Q-table 編譯出的貪婪策略：每個離散狀態的最佳動作預先算好 (同值取最小的動作，與 QLearn.best_action 一致)
+# 推論時把 QLearn.discretize_state 與查表合併成 distances → action，只需要索引
+class GreedyPolicy():
+    def __init__(self, actions, bins):
+        self.actions = np.asarray(actions)  # state_shape 的動作陣列 (state → action)
+        self.bins = [list(b) for b in bins]  # 每個感測器的分箱邊界
+        self.flat = self.actions.ravel().tolist()  # 單筆查表用
+        shape = self.actions.shape
+        self.strides = [int(np.prod(shape[i + 1:])) for i in range(len(shape))]
+
+    @classmethod
+    def from_table(cls, model, table=None):
+        if table is None:
+            table = model.q_table
+        actions = model.action_space[np.argmax(np.asarray(table), axis=-1)]
+        return cls(actions, model.bin_lists)
+
+    # 與 QLearn.discretize_state 相同：距離小於第 k 個邊界時落在第 k 格
+    def state(self, distances):
+        return tuple(bisect.bisect_right(bins, d) for bins, d in zip(self.bins, distances))
+
+    # 單筆：distances (front, left, right) → action
+    def act(self, distances):
+        index = 0
+        for bins, stride, d in zip(self.bins, self.strides, distances):
+            index += stride * bisect.bisect_right(bins, d)
+        return self.flat[index]
+
+    # 多筆：distances 為 (N, 3)，回傳 (N,) 動作陣列
+    def act_batch(self, distances):
+        distances = np.asarray(distances, dtype=float)
+        states = tuple(np.searchsorted(bins, distances[:, i], side='right') for i, bins in enumerate(self.bins))
+        return self.actions[states]
@@ -0,0 +1,69 @@
+import time
+from collections import defaultdict
+
+# 低開銷的階段計時器：以單調時鐘 (perf_counter) 累加每個階段的時間與次數，另有一般計數器
+# 呼叫端以 `if profiler is not None` 包住計時，停用 (profiler 為 None) 時只多一次比較
+class Profiler():
+    NESTED = {'sense': 'move'}  # 巢狀階段 (時間已包含在上層階段中)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.started = time.perf_counter()
+
+    # 把 start 到現在的時間記到 phase，回傳現在的時間 (可直接作為下一個階段的 start)
+    def lap(self, phase, start):
+        now = time.perf_counter()
+        self.totals[phase] += now - start
+        self.calls[phase] += 1
+        return now
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    # (phase, 總秒數, 次數, 每次 us, 佔總時間比例)，依總秒數排序
+    def rows(self):
+        elapsed = max(self.elapsed(), 1e-9)
+        totals = dict(self.totals)
+        rows = [(phase, total, self.calls[phase], total / max(self.calls[phase], 1) * 1e6, total / elapsed) for phase, total in totals.items()]
+        return sorted(rows, key=lambda row: -row[1])
+
+    def summary(self):
+        elapsed = self.elapsed()
+        lines = [f'{"phase":<14}{"total s":>9}{"calls":>9}{"us/call":>10}{"share":>8}']
+        for phase, total, calls, per_call, share in self.rows():
+            name = f' {phase} ({self.NESTED[phase]})' if phase in self.NESTED else phase
+            lines.append(f'{name:<14}{total:9.3f}{calls:9d}{per_call:10.2f}{share * 100:7.1f}%')
+        counters = dict(self.counters)
+        steps = counters.get('steps', 0)
+        lines.append(f'elapsed {elapsed:.2f}s  ' + '  '.join(f'{name} {value}' for name, value in counters.items()) + (f'  steps/s {steps / elapsed:.0f}' if steps and elapsed > 0 else ''))
+        return '\n'.join(lines)
+
+# 包住感測器，把每次量測的時間記到 'sense' 階段 (只在啟用 profiler 時使用)
+class ProfiledSensor():
+    def __init__(self, sensor, profiler):
+        self.sensor = sensor
+        self.profiler = profiler
+        self.track = sensor.track
+
+    def measure(self, x, y, angle):
+        start = time.perf_counter()
+        distances = self.sensor.measure(x, y, angle)
+        self.profiler.lap('sense', start)
+        return distances
+
+    def measure_batch(self, xs, ys, angles):
+        start = time.perf_counter()
+        distances = self.sensor.measure_batch(xs, ys, angles)
+        self.profiler.lap('sense', start)
+        return distances
+
+    def __getattr__(self, name):
+        return getattr(self.sensor, name)
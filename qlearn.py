@@ -1,67 +1,187 @@
+import argparse
+import bisect
 import numpy as np
 import os, sys
+import json
+from policy import GreedyPolicy
+from qtable import LazyQTable
+
+QTABLE_FORMAT = 'qlearn-qtable'
+QTABLE_VERSION = 1
+RANDOM_BLOCK = 4096  # 每次預先產生的探索亂數數量
 
 # Q-Learning implementation
 class QLearn() :
-    def __init__(self, lrn_rate=0.1, gamma=0.9, epsilon=0.99, discount=0.9):
+    supports_fleet = True  # 可否以 run_fleet 同時更新多個回合
+    def __init__(self, lrn_rate=0.1, gamma=0.9, epsilon=0.99, discount=0.9, state_bins=None, seed=None):
         self.lrn_rate = lrn_rate
         self.gamma = gamma
         self.epsilon = epsilon
         self.decay = discount  # Decay rate for epsilon
-        self.q_table = {}  # Q-table to store Q-values
         self.action_space = np.arange(-45, 46, 1)  # 動作空間：-45°到45°的範圍
-        self.state_bins = [3, 7, 12]  # 感測器距離分箱
-        self.temp_qtable = {}  # 用於存儲臨時 Q 值的表格
+        self.set_state_bins(state_bins if state_bins is not None else [3, 7, 12])  # 感測器距離分箱
+        self.q_table = None  # Q-table to store Q-values, shape state_shape + (actions,)
+        self.temp_qtable = None  # 用於存儲臨時 Q 值的表格
+        self.episodes = 0  # 已訓練的回合數 (保存在 Q-table metadata 中)
+        # 每個 learner 自己的亂數產生器：相同的 seed 產生相同的軌跡 (seed 也可以是 np.random.Generator)
+        self.rng = np.random.default_rng(seed)
+        self.uniforms = []        # 預先產生的 [0, 1) 亂數 (決定是否探索)
+        self.random_actions = []  # 預先產生的隨機動作
+        self.uniform_pos = 0
+        self.action_pos = 0
+
 
+    # bins 為所有感測器共用的邊界列表，或每個感測器 (front, left, right) 各自的邊界列表
+    # Q-table 大小由分箱決定：每個感測器 len(bins) + 1 個離散狀態
+    def set_state_bins(self, bins):
+        self.sensor_bins = check_state_bins(bins)
+        self.bin_lists = [b.tolist() for b in self.sensor_bins]
+        self.state_bins = self.bin_lists[0] if all(b == self.bin_lists[0] for b in self.bin_lists) else self.bin_lists
+        self.state_shape = tuple(len(b) + 1 for b in self.sensor_bins)
 
     def initialize_q_table(self):
         print('Initializing Q-Table...')
         print('Learning Rate:', self.lrn_rate)
         print('Discount Factor:', self.gamma)
         print('Epsilon:', self.epsilon)
-        # 自動生成所有可能的離散狀態組合
-        states = [(i, j, k) for i in range(4) for j in range(4) for k in range(4)]
-        for state in states:
-            self.temp_qtable[state] = {action: 0.0 for action in self.action_space}
-        print('Q-Table initialized with states:', len(self.temp_qtable))
+        # 狀態在第一次更新時才配置 (未出現過的狀態 Q 值為 0)
+        self.temp_qtable = LazyQTable(self.state_shape, len(self.action_space))
+        print('Q-Table initialized with states:', int(np.prod(self.state_shape)), '(allocated on first visit)')
         print('Action Space:', len(self.action_space))
     
+    # 將連續距離離散化為狀態：距離小於第 k 個邊界時落在第 k 格 (np.digitize 的語意)
+    # distances 為單筆 (3,) 時回傳 tuple，為 (N, 3) 時回傳 (N, 3) 的整數陣列
     def discretize_state(self, distances):
-        # 將連續距離離散化為狀態
-        state = []
-        for d in distances:
-            if d < self.state_bins[0]:
-                state.append(0)
-            elif d < self.state_bins[1]:
-                state.append(1)
-            elif d < self.state_bins[2]:
-                state.append(2)
-            else:
-                state.append(3)
-        return tuple(state)
-    
+        if np.ndim(distances) == 1:
+            # 單筆讀值以 bisect 查找，避免每一步呼叫 NumPy 的額外開銷 (結果與 np.digitize 相同)
+            return tuple(bisect.bisect_right(bins, d) for bins, d in zip(self.bin_lists, distances))
+        distances = np.asarray(distances, dtype=float)
+        return np.stack([np.digitize(distances[:, i], bins) for i, bins in enumerate(self.sensor_bins)], axis=-1)
+
+    def action_index(self, action):
+        return int(action) - int(self.action_space[0])
+
+    # 回傳 table (預設為最佳 Q-table) 中 state 的最佳動作，同值時取最小的動作
+    def best_action(self, state, table=None):
+        if table is None:
+            table = self.q_table
+        return self.action_space[np.argmax(table[state])]
+
+    # 訓練中第一次被更新而配置的狀態數
+    def materialized_states(self):
+        return self.temp_qtable.materialized if self.temp_qtable is not None else 0
+
+    # 由 table (預設為最佳 Q-table) 編譯出 distances → action 的貪婪策略 (table 之後不應再修改)
+    def compile_policy(self, table=None):
+        if table is None:
+            table = self.q_table
+        return GreedyPolicy.from_table(self, table)
+
+    # 一次選出多個狀態的動作，states 為 (N, 3) 的整數陣列
+    def choose_actions(self, states):
+        states = np.asarray(states)
+        actions = self.action_space[np.argmax(self.temp_qtable[tuple(states.T)], axis=-1)]
+        explore = self.rng.random(len(states)) < self.epsilon
+        actions[explore] = self.action_space[self.rng.integers(0, len(self.action_space), explore.sum())]
+        return actions
+
+    # 從預先產生的區塊取出下一個亂數，用完時一次補充 RANDOM_BLOCK 個
+    def random_uniform(self):
+        if self.uniform_pos == len(self.uniforms):
+            self.uniforms = self.rng.random(RANDOM_BLOCK).tolist()
+            self.uniform_pos = 0
+        self.uniform_pos += 1
+        return self.uniforms[self.uniform_pos - 1]
+
+    def random_action(self):
+        if self.action_pos == len(self.random_actions):
+            self.random_actions = self.action_space[self.rng.integers(0, len(self.action_space), RANDOM_BLOCK)].tolist()
+            self.action_pos = 0
+        self.action_pos += 1
+        return self.random_actions[self.action_pos - 1]
+
     def choose_action(self, state):
-        if np.random.rand() < self.epsilon:
-            return np.random.choice(self.action_space)  # Explore with random action
+        if self.random_uniform() < self.epsilon:
+            return self.random_action()  # Explore with random action
         else:
-            return max(self.temp_qtable[state], key=self.temp_qtable[state].get)  # Exploit with best action
+            return self.best_action(state, self.temp_qtable)  # Exploit with best action
     
+    # 每個回合開始時呼叫 (QLambda 用來清除 eligibility trace)
+    def start_episode(self):
+        pass
+
     def update_q_value(self, state, action, reward, next_state):
-        if state not in self.temp_qtable:
-            self.initialize_q_table()  # 確保狀態存在
-        max_next_q = max(self.temp_qtable[next_state].values())
-        self.temp_qtable[state][action] += self.lrn_rate * (
-            reward + self.gamma * max_next_q - self.temp_qtable[state][action]
+        if self.temp_qtable is None:
+            self.initialize_q_table()  # 確保 Q-table 存在
+        max_next_q = self.temp_qtable[next_state].max()
+        row = self.temp_qtable.row(state)
+        index = self.action_index(action)
+        row[index] += self.lrn_rate * (
+            reward + self.gamma * max_next_q - row[index]
         )
+    # 批次更新 (經驗回放)：以目前的 Q 值算出整批的 TD 目標，再用 np.add.at 一次分散加到 Q-table
+    # 同一批中重複的 (狀態, 動作) 會累加各自的更新量；dones 為 True 的轉移不再往後估計
+    def update_batch(self, states, actions, rewards, next_states, dones=None):
+        if self.temp_qtable is None:
+            self.initialize_q_table()  # 確保 Q-table 存在
+        table = self.temp_qtable
+        states = np.asarray(states)
+        next_states = np.asarray(next_states)
+        for state in set(map(tuple, states.tolist())):
+            table.row(state)  # 配置這一批中尚未出現過的狀態
+        max_next_q = table[tuple(next_states.T)].max(axis=1)
+        if dones is not None:
+            max_next_q = np.where(dones, 0.0, max_next_q)
+        rows = table.index[tuple(states.T)]
+        index = np.asarray(actions) - int(self.action_space[0])
+        td = np.asarray(rewards) + self.gamma * max_next_q - table.values[rows, index]
+        np.add.at(table.values, (rows, index), self.lrn_rate * td)
+
     def update_qtable(self):
-        self.q_table = self.temp_qtable.copy()  # 儲存最好的 Q Table
+        self.q_table = self.temp_qtable.snapshot(self.q_table)  # 儲存最好的 Q Table (只複製上次之後修改過的列)
+
+    # 從舊版 {state: {action: value}} 格式載入，缺少的動作設為 -inf 以免被選為最佳動作
+    def from_dict(self, q_dict):
+        table = np.full(self.state_shape + (len(self.action_space),), -np.inf)
+        for state, actions in q_dict.items():
+            for action, value in actions.items():
+                table[tuple(state) + (self.action_index(action),)] = value
+        return table
     
+    def metadata(self):
+        return {
+            'format': QTABLE_FORMAT,
+            'version': QTABLE_VERSION,
+            'shape': list(self.state_shape) + [len(self.action_space)],
+            'state_bins': self.bin_lists,
+            'action_space': [int(a) for a in self.action_space],
+            'lrn_rate': self.lrn_rate,
+            'gamma': self.gamma,
+            'epsilon': self.epsilon,
+            'decay': self.decay,
+            'episodes': self.episodes,
+        }
+
     # 新增方法：保存 Q-table 到文件
+    # <filename> 為純 float64 陣列 (不需 pickle，可 memory-map)，超參數等 metadata 存在同名的 .json
+    # 尚未有最佳 Q-table 時保存目前訓練中的表格
     def save_q_table(self, filename="best_qtable.npy"):
-        np.save(filename, self.q_table)  # 使用 numpy 保存為二進制文件
+        table = self.q_table if self.q_table is not None else self.temp_qtable
+        if table is None:
+            table = np.zeros(self.state_shape + (len(self.action_space),))
+        # table 可能是同一個檔案的唯讀 memory-map：先複製到記憶體，再寫到暫存檔後取代原檔
+        table = np.array(table, dtype=np.float64)
+        if not filename.endswith('.npy'):
+            filename += '.npy'  # 與 np.save 的命名相同
+        with open(filename + '.tmp', 'wb') as f:
+            np.save(f, table, allow_pickle=False)
+        os.replace(filename + '.tmp', filename)
+        with open(metadata_path(filename) + '.tmp', 'w') as f:
+            json.dump(self.metadata(), f, indent=1)
+        os.replace(metadata_path(filename) + '.tmp', metadata_path(filename))
         print(f"Q-table saved to {filename}")
 
-    # 新增方法：從文件加載 Q-table
+    # 新增方法：從文件加載 Q-table (唯讀 memory-map)，舊版 pickle dict 格式會自動轉換
     def load_q_table(self, filename="default_qtable.npy"):
        
         # read default.txt
@@ -70,5 +190,135 @@ class QLearn() :
         else:
             path = os.path.join(os.path.abspath("."), filename)
 
-        self.q_table = np.load(path, allow_pickle=True).item()
+        try:
+            table = np.load(path, mmap_mode='r', allow_pickle=False)
+        except ValueError:
+            # 舊版格式：0 維 object 陣列中的 {state: {action: value}}
+            self.q_table = self.from_dict(np.load(path, allow_pickle=True).item())
+            return
+
+        meta = {}
+        if os.path.exists(metadata_path(path)):
+            with open(metadata_path(path), 'r') as f:
+                meta = json.load(f)
+            if meta.get('format') != QTABLE_FORMAT or meta.get('version', 0) > QTABLE_VERSION:
+                raise ValueError(f'Unsupported Q-table file: {path}')
+            if meta['action_space'] != [int(a) for a in self.action_space]:
+                raise ValueError(f'Q-table {path} was saved with a different action space')
+            self.set_state_bins(meta['state_bins'])  # 依檔案的分箱調整狀態空間
+            self.lrn_rate = meta['lrn_rate']
+            self.gamma = meta['gamma']
+            self.epsilon = meta['epsilon']
+            self.decay = meta['decay']
+            self.episodes = meta['episodes']
+        if table.shape != self.state_shape + (len(self.action_space),):
+            raise ValueError(f'Q-table {path} has shape {table.shape}, expected {self.state_shape + (len(self.action_space),)}')
+        self.q_table = table
+
+# Q(λ) / SARSA(λ)：以 eligibility trace 把每一步的 TD 誤差一次套用到整條軌跡上所有走過的 (狀態, 動作)，
+# 終點的大獎勵不必一個回合只往回傳一步
+#   'watkins' - Watkins Q(λ)：目標為 max Q(s')，採取探索動作時把 trace 歸零
+#   'sarsa'   - SARSA(λ)：目標為 Q(s', a')，a' 在更新時就選好，下一步的 choose_action 直接使用
+# trace 為與 temp_qtable.values 對齊的稠密陣列 (replacing trace)；同一時間只能追蹤一條軌跡，因此不支援 run_fleet
+class QLambda(QLearn):
+    MODES = ('watkins', 'sarsa')
+    supports_fleet = False
+
+    def __init__(self, lrn_rate=0.1, gamma=0.9, epsilon=0.99, discount=0.9, state_bins=None, lam=0.8, mode='watkins', seed=None):
+        super().__init__(lrn_rate, gamma, epsilon, discount, state_bins, seed)
+        if mode not in self.MODES:
+            raise ValueError(f'Unknown trace mode: {mode}')
+        self.lam = lam
+        self.mode = mode
+        self.trace = None
+        self.traced = set()       # trace 不為 0 的列
+        self.next_action = None   # SARSA：(next_state, a')
+        self.greedy = True        # 上一次選出的動作是否為貪婪動作
+
+    def start_episode(self):
+        if self.trace is not None and self.traced:
+            self.trace[list(self.traced)] = 0
+        self.traced = set()
+        self.next_action = None
+
+    def choose_action(self, state):
+        if self.next_action is not None and self.next_action[0] == state:
+            action = self.next_action[1]
+        else:
+            action = super().choose_action(state)
+        self.next_action = None
+        self.greedy = action == self.best_action(state, self.temp_qtable)
+        return action
+
+    def update_q_value(self, state, action, reward, next_state):
+        if self.temp_qtable is None:
+            self.initialize_q_table()  # 確保 Q-table 存在
+        table = self.temp_qtable
+        if self.mode == 'sarsa':
+            next_action = super().choose_action(next_state)
+            self.next_action = (next_state, next_action)
+            next_q = table[next_state][self.action_index(next_action)]
+        else:
+            next_q = table[next_state].max()
+        row = table.row(state)
+        index = self.action_index(action)
+        delta = reward + self.gamma * next_q - row[index]
+
+        if self.trace is None or len(self.trace) < len(table.values):
+            trace = np.zeros(table.values.shape)
+            if self.trace is not None:
+                trace[:len(self.trace)] = self.trace
+            self.trace = trace
+        if self.mode == 'watkins' and not self.greedy:
+            self.start_episode()  # 探索動作之後的回報不屬於貪婪策略，切斷 trace
+        i = int(table.index[state])
+        self.trace[i] = 0
+        self.trace[i, index] = 1
+        self.traced.add(i)
+
+        # 一次更新所有被追蹤的列
+        rows = np.fromiter(self.traced, dtype=np.intp, count=len(self.traced))
+        table.values[rows] += self.lrn_rate * delta * self.trace[rows]
+        table.dirty.update(self.traced)
+        self.trace[rows] *= self.gamma * self.lam
+
+    def metadata(self):
+        meta = super().metadata()
+        meta['lambda'] = self.lam
+        meta['trace'] = self.mode
+        return meta
+
+# 檢查分箱邊界並回傳三個感測器 (前、左、右) 各自的陣列；單一串列代表三個感測器共用
+def check_state_bins(bins):
+    if np.ndim(bins[0]) == 0:
+        bins = [bins] * 3
+    if len(bins) != 3:
+        raise ValueError(f'Expected bins for 3 sensors (front, left, right), got {len(bins)}')
+    sensor_bins = [np.asarray(b, dtype=float) for b in bins]
+    for b in sensor_bins:
+        if b.ndim != 1 or np.any(np.diff(b) <= 0):
+            raise ValueError(f'State bins must be strictly increasing: {b.tolist()}')
+    return sensor_bins
+
+def metadata_path(filename):
+    return os.path.splitext(filename)[0] + '.json'
+
+# 將舊版 pickle dict 格式的 Q-table 轉換為新格式 (覆寫原檔)，已是新格式的檔案不做任何事
+def migrate_q_table(filename):
+    try:
+        np.load(filename, mmap_mode='r', allow_pickle=False)
+    except ValueError:
+        pass
+    else:
+        print(f"{filename} is already in the current format")
+        return
+    model = QLearn()
+    model.load_q_table(filename)
+    model.save_q_table(filename)
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert legacy pickled Q-table files to the .npy + .json format in place')
+    parser.add_argument('files', nargs='+')
+    args = parser.parse_args()
+    for filename in args.files:
+        migrate_q_table(filename)
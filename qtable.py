@@ -0,0 +1,64 @@
+import numpy as np
+
+# 延遲配置的 Q-table：只有被更新過的狀態才配置一列動作值 (每個新狀態 O(actions) 一次)，
+# 未出現過的狀態共用第 0 列 (預設值)，因此增加分箱數時記憶體與初始化成本只隨實際走過的狀態成長
+# index[state] 為狀態的列號 (0 表示尚未配置)，values[index[state]] 為該狀態的動作值
+class LazyQTable():
+    def __init__(self, state_shape, actions, default=0.0, capacity=64):
+        self.state_shape = tuple(state_shape)
+        self.shape = self.state_shape + (actions,)
+        self.index = np.zeros(self.state_shape, dtype=np.int32)
+        self.values = np.empty((capacity + 1, actions))
+        self.values[0] = default
+        self.rows = 1             # 已使用的列數 (含預設列)
+        self.materialized = 0     # 新配置的狀態數
+        self.row_states = [-1]    # 每一列對應的狀態 (flat index)
+        self.dirty = set()        # 上一次快照之後被修改的列
+        self.version = 0          # 快照次數
+        self.source = None        # 快照來源 (快照本身才會設定)
+
+    # 讀取 (唯讀)：state 為整數 tuple 時回傳 (actions,)，為整數陣列的 tuple 時回傳 (N, actions)
+    def __getitem__(self, state):
+        return self.values[self.index[state]]
+
+    # 取得 state 可寫入的列，第一次寫入時才配置
+    def row(self, state):
+        i = self.index[state]
+        if i == 0:
+            if self.rows == len(self.values):
+                self.values = np.concatenate([self.values, np.empty_like(self.values)])  # 容量加倍
+            i = self.index[state] = self.rows
+            self.values[i] = self.values[0]
+            self.rows += 1
+            self.materialized += 1
+            self.row_states.append(int(np.ravel_multi_index(state, self.state_shape)))
+        self.dirty.add(i)
+        return self.values[i]
+
+    # 時間點快照 (double buffer)：target 為上一次由此表格建立的快照時直接原地更新，
+    # 只複製之後被修改的列與新配置的狀態 (O(changed rows))；否則建立完整複本
+    # 快照不會再隨訓練改變，直到下一次以它為 target 呼叫 snapshot
+    def snapshot(self, target=None):
+        if target is None or getattr(target, 'source', None) is not self or target.version != self.version:
+            target = LazyQTable(self.state_shape, self.shape[-1], capacity=len(self.values) - 1)
+            target.source = self
+            target.index[...] = self.index
+            rows = np.arange(self.rows)
+        else:
+            if len(target.values) < len(self.values):
+                target.values = np.concatenate([target.values, np.empty((len(self.values) - len(target.values), self.shape[-1]))])
+            new = np.arange(target.rows, self.rows)
+            target.index.flat[np.asarray(self.row_states, dtype=np.intp)[new]] = new
+            rows = np.fromiter(self.dirty, dtype=np.intp, count=len(self.dirty))
+        target.values[rows] = self.values[rows]
+        target.rows = self.rows
+        target.materialized = self.materialized
+        self.dirty = set()
+        self.version += 1
+        target.version = self.version
+        return target
+
+    # 轉換為稠密陣列 (np.asarray 時使用)
+    def __array__(self, dtype=None, copy=None):
+        dense = self.values[self.index]
+        return dense if dtype is None else dense.astype(dtype, copy=False)
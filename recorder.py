@@ -0,0 +1,154 @@
+import os
+import json
+import numpy as np
+from trainer import Frame
+
+# 每一步記錄的欄位
+STEP_DTYPE = np.dtype([
+    ('episode', '<i4'),
+    ('step', '<i4'),
+    ('x', '<f8'),
+    ('y', '<f8'),
+    ('phi', '<f8'),
+    ('theta', '<f8'),
+    ('front', '<f8'),
+    ('left', '<f8'),
+    ('right', '<f8'),
+    ('state', 'u1', (3,)),
+    ('action', '<i2'),
+    ('reward', '<f4'),
+])
+# 回合索引：每個回合在記錄中的起始列
+INDEX_DTYPE = np.dtype([('episode', '<i8'), ('start', '<i8')])
+LOG_VERSION = 2
+
+# 軌跡記錄器：每一步寫入預先配置的 structured buffer，滿了就把每個欄位附加到各自的二進位檔
+# (<path>/<欄位>.bin，columnar 格式)，因此記憶體用量固定，檔案可以 np.memmap 直接讀取
+# 每個回合的起始列另外寫入 episodes.bin，讀取時可直接跳到任一回合
+# 同一回合的每一步必須連續記錄
+class EpisodeRecorder():
+    def __init__(self, path, buffer_size=65536):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.buffer = np.zeros(buffer_size, dtype=STEP_DTYPE)
+        self.count = 0
+        self.files = {name: open(os.path.join(path, name + '.bin'), 'ab') for name in STEP_DTYPE.names}
+        self.rows = count_rows(path)
+        self.index_file = open(os.path.join(path, 'episodes.bin'), 'ab')
+        self.index = []
+        self.current_episode = None
+        self.write_meta()
+
+    def record(self, episode, step, x, y, phi, theta, distances, state, action, reward):
+        if episode != self.current_episode:
+            self.current_episode = episode
+            self.index.append((episode, self.rows + self.count))
+        self.buffer[self.count] = (episode, step, x, y, phi, theta, distances[0], distances[1], distances[2], state, action, reward)
+        self.count += 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+    def record_car(self, episode, step, car, state, action, reward):
+        self.record(episode, step, car.currentX, car.currentY, car.currentPHI, car.currentTHETA, car.get_distances(), state, action, reward)
+
+    def flush(self):
+        if self.count == 0:
+            return
+        for name, f in self.files.items():
+            f.write(np.ascontiguousarray(self.buffer[name][:self.count]).tobytes())
+            f.flush()
+        self.rows += self.count
+        self.count = 0
+        if self.index:
+            self.index_file.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+            self.index_file.flush()
+            self.index = []
+        self.write_meta()
+
+    def write_meta(self):
+        meta = {
+            'version': LOG_VERSION,
+            'rows': self.rows,
+            'columns': {name: [STEP_DTYPE[name].base.str, list(STEP_DTYPE[name].shape)] for name in STEP_DTYPE.names},
+            'index': 'episodes.bin',
+        }
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# 依檔案大小計算完整寫入的列數 (各欄位取最小值)
+def count_rows(path):
+    rows = None
+    for name in STEP_DTYPE.names:
+        filename = os.path.join(path, name + '.bin')
+        n = os.path.getsize(filename) // STEP_DTYPE[name].itemsize if os.path.exists(filename) else 0
+        rows = n if rows is None else min(rows, n)
+    return rows or 0
+
+# 讀取記錄：回傳 {欄位: 陣列}，mmap=True 時以 np.memmap 唯讀映射，不佔用記憶體
+def load_log(path, columns=None, mmap=True):
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if meta['version'] > LOG_VERSION:
+        raise ValueError(f'Unsupported log version: {meta["version"]}')
+    rows = count_rows(path)
+    log = {}
+    for name in columns or meta['columns']:
+        dtype, shape = meta['columns'][name]
+        filename = os.path.join(path, name + '.bin')
+        if rows == 0:
+            log[name] = np.zeros((0,) + tuple(shape), dtype=dtype)
+        elif mmap:
+            log[name] = np.memmap(filename, dtype=dtype, mode='r', shape=(rows,) + tuple(shape))
+        else:
+            log[name] = np.fromfile(filename, dtype=dtype, count=rows * int(np.prod(shape))).reshape((rows,) + tuple(shape))
+    return log
+
+# 以記憶體映射開啟記錄，開啟時間與記錄大小無關；選擇某個回合時直接依索引取出該回合的列
+class TrajectoryLog():
+    def __init__(self, path):
+        self.path = path
+        self.columns = load_log(path)
+        self.rows = count_rows(path)
+        filename = os.path.join(path, 'episodes.bin')
+        count = os.path.getsize(filename) // INDEX_DTYPE.itemsize if os.path.exists(filename) else 0
+        if count:
+            self.index = np.memmap(filename, dtype=INDEX_DTYPE, mode='r', shape=(count,))
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.index)
+
+    # 回合的列範圍 [start, stop)；若同一回合編號出現多次 (多次訓練附加到同一記錄) 取最後一次
+    def episode_range(self, episode):
+        matches = np.flatnonzero(self.index['episode'] == episode)
+        if matches.size == 0:
+            raise KeyError(f'Episode {episode} is not in the log')
+        i = matches[-1]
+        start = int(self.index['start'][i])
+        stop = int(self.index['start'][i + 1]) if i + 1 < len(self.index) else self.rows
+        return start, min(stop, self.rows)
+
+    def episode(self, episode, columns=None):
+        start, stop = self.episode_range(episode)
+        return {name: np.asarray(self.columns[name][start:stop]) for name in columns or self.columns}
+
+    # 轉換成 trainer.Frame 列表 (供 ReplayPlayer 播放)
+    def frames(self, episode):
+        rows = self.episode(episode, ['x', 'y', 'phi', 'front', 'left', 'right', 'step'])
+        count = len(rows['x'])
+        return [Frame(float(rows['x'][i]), float(rows['y'][i]), float(rows['phi'][i]),
+                      [float(rows['front'][i]), float(rows['left'][i]), float(rows['right'][i])],
+                      episode, int(rows['step'][i]), i == count - 1) for i in range(count)]
@@ -0,0 +1,92 @@
+import math
+import time
+import matplotlib.pyplot as plt
+
+SENSOR_COLORS = {'Front': 'red', 'Left': 'green', 'Right': 'blue'}
+SENSOR_OFFSETS = {'Front': 0, 'Left': 45, 'Right': -45}
+
+# 以 blitting 增量繪製：靜態賽道只畫一次並快取成背景，每幀只重畫車子、感測器箭頭、路徑與文字
+class TrackRenderer():
+    def __init__(self, canvas, ax, radius=3, fps=30):
+        self.canvas = canvas
+        self.ax = ax
+        self.radius = radius
+        self.fps = fps                 # 最高繪製幀率，None 表示每次 update 都繪製
+        self.last_draw = 0.0
+        self.background = None
+        self.path_x = []
+        self.path_y = []
+
+        self.car_circle = plt.Circle((0, 0), radius, edgecolor='black', facecolor='none', animated=True)
+        self.center_point = plt.Circle((0, 0), 0.5, color='darkgrey', animated=True)
+        ax.add_artist(self.car_circle)
+        ax.add_artist(self.center_point)
+        self.arrows = {}
+        for direction, color in SENSOR_COLORS.items():
+            self.arrows[direction] = ax.arrow(0, 0, 0, 0, head_width=1, head_length=2, fc=color, ec=color, animated=True, visible=False)
+        self.path_line, = ax.plot([], [], 'o', color='darkgrey', markersize=3, animated=True)
+        self.text = ax.text(0.95, 0.05, '', transform=ax.transAxes, fontsize=8, ha='right', va='bottom', animated=True)
+        self.animated_artists = [self.path_line, self.car_circle, self.center_point] + list(self.arrows.values()) + [self.text]
+
+        # 每次完整重繪 (例如視窗縮放) 後重新擷取背景
+        self.draw_cid = canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event=None):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        for artist in self.animated_artists:
+            self.ax.draw_artist(artist)
+
+    # 清除路徑 (新回合開始時呼叫)
+    def reset_path(self):
+        self.path_x = []
+        self.path_y = []
+        self.path_line.set_data([], [])
+
+    def set_car(self, x, y, phi, distances, episode='-', step='-', show_sensors=True):
+        self.car_circle.center = (x, y)
+        self.center_point.center = (x, y)
+        for direction, distance in zip(('Front', 'Left', 'Right'), distances):
+            angle = math.radians(phi + SENSOR_OFFSETS[direction])
+            length = distance - 2
+            self.arrows[direction].set_data(x=x, y=y, dx=length * math.cos(angle), dy=length * math.sin(angle))
+            self.arrows[direction].set_visible(show_sensors)
+        self.text.set_text(f'Episode {episode}\n Current Step: {step}\nCar Center: ({x:.2f}, {y:.2f})\n Front: {distances[0]:.2f}\n Left: {distances[1]:.2f}\n Right: {distances[2]:.2f}')
+
+    # 記錄路徑並依幀率限制繪製 (frame skip)，回傳是否有實際繪製
+    def update(self, car, episode='-', step='-', force=False):
+        return self.draw_pose(car.currentX, car.currentY, car.currentPHI, car.get_distances(), episode, step, force)
+
+    # 同 update，但使用 trainer.Frame 快照
+    def update_frame(self, frame, force=False):
+        return self.draw_pose(frame.x, frame.y, frame.phi, frame.distances, frame.episode, frame.step, force or frame.done)
+
+    def draw_pose(self, x, y, phi, distances, episode='-', step='-', force=False):
+        self.path_x.append(x)
+        self.path_y.append(y)
+        if not force and self.fps and time.perf_counter() - self.last_draw < 1.0 / self.fps:
+            return False
+        self.show_pose(x, y, phi, distances, episode, step)
+        return True
+
+    # 立即繪製 (不記錄路徑、不受幀率限制)
+    def show_pose(self, x, y, phi, distances, episode='-', step='-'):
+        self.last_draw = time.perf_counter()
+        self.path_line.set_data(self.path_x, self.path_y)
+        self.set_car(x, y, phi, distances, episode, step)
+        self.blit()
+
+    def set_path(self, xs, ys):
+        self.path_x = list(xs)
+        self.path_y = list(ys)
+
+    def blit(self):
+        if self.background is None:
+            # 第一次繪製：完整重繪後由 on_draw 擷取背景
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_animated()
+            self.canvas.blit(self.ax.bbox)  # 由 Tk 主迴圈重繪，不在此處處理事件 (避免在 after 回呼中重入)
@@ -0,0 +1,88 @@
+# 以 root.after 排程播放已計算好的軌跡，不阻塞 Tk 主迴圈；支援速度調整、拖曳 (seek) 與取消
+class ReplayPlayer():
+    def __init__(self, root, renderer, interval=20, on_position=None):
+        self.root = root
+        self.renderer = renderer
+        self.interval = interval        # 每次排程的間隔 (ms)
+        self.on_position = on_position  # on_position(index)：播放位置改變時通知 (例如更新拖曳條)
+        self.frames = []
+        self.position = 0.0
+        self.index = -1
+        self.speed = 1.0                # 每次排程前進的步數
+        self.after_id = None
+        self.ticking = False            # tick 正在繪製中 (繪製期間被 cancel 時設為 False)
+        self.on_done = None
+
+    def playing(self):
+        return self.after_id is not None or self.ticking
+
+    # on_done(cancelled)：播放結束或被取消時呼叫
+    def play(self, frames, speed=1.0, on_done=None):
+        self.cancel()
+        self.frames = frames
+        self.speed = speed
+        self.on_done = on_done
+        self.position = 0.0
+        self.index = -1
+        self.renderer.reset_path()
+        self.after_id = self.root.after(0, self.tick)
+
+    def set_speed(self, speed):
+        self.speed = max(float(speed), 0.01)
+
+    def tick(self):
+        self.after_id = None
+        if not self.frames:
+            self.finish(False)
+            return
+        self.position = min(self.position + self.speed, len(self.frames))
+        target = max(int(self.position) - 1, 0)
+        self.ticking = True
+        self.advance(target)
+        if not self.ticking:  # 繪製期間被取消或重新 play，不再排程
+            return
+        self.ticking = False
+        if target >= len(self.frames) - 1:
+            self.finish(False)
+        else:
+            self.after_id = self.root.after(self.interval, self.tick)
+
+    # 依序前進到 target，途中的位置只加入路徑
+    def advance(self, target):
+        for frame in self.frames[self.index + 1:target + 1]:
+            self.renderer.path_x.append(frame.x)
+            self.renderer.path_y.append(frame.y)
+        self.index = target
+        self.draw()
+
+    # 直接跳到 index (拖曳)，路徑重建為 frames[:index + 1]
+    def seek(self, index):
+        if not self.frames:
+            return
+        index = min(max(int(index), 0), len(self.frames) - 1)
+        if index == self.index:
+            return
+        self.renderer.set_path([f.x for f in self.frames[:index + 1]], [f.y for f in self.frames[:index + 1]])
+        self.index = index
+        self.position = float(index + 1)
+        self.draw()
+
+    def draw(self):
+        frame = self.frames[self.index]
+        self.renderer.show_pose(frame.x, frame.y, frame.phi, frame.distances, frame.episode, frame.step)
+        if self.on_position is not None:
+            self.on_position(self.index)
+
+    def cancel(self):
+        if self.after_id is None and not self.ticking:
+            return
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        self.ticking = False
+        self.finish(True)
+
+    def finish(self, cancelled):
+        on_done, self.on_done = self.on_done, None
+        if on_done is not None:
+            on_done(cancelled)
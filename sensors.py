@@ -0,0 +1,234 @@
+import math
+import numpy as np
+from track import as_track
+
+SENSOR_ANGLES = [0, 45, -45]  # front, left, right (相對於車子方向)
+MAX_DISTANCE = 50             # 感測器最大偵測距離
+
+# 原始的逐段迴圈版本，保留作為正確性與效能比較的基準
+def calculate_sensors_loop(track, x, y, angle):
+    angle_rad = np.radians(angle)
+    distances = []
+
+    for sensor_angle in SENSOR_ANGLES:
+        abs_angle = angle_rad + np.radians(sensor_angle)
+        ray_points = np.array([
+            [x, y],
+            [x + MAX_DISTANCE * np.cos(abs_angle),
+            y + MAX_DISTANCE * np.sin(abs_angle)]
+        ])
+
+        min_dist = MAX_DISTANCE
+        for i in range(len(track) - 1):
+            wall = np.array([track[i], track[i + 1]])
+            x1, y1 = ray_points[0]
+            x2, y2 = ray_points[1]
+            x3, y3 = wall[0]
+            x4, y4 = wall[1]
+
+            denominator = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+            if denominator == 0:
+                continue
+
+            t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / denominator
+            u = -((x1 - x2) * (y1 - y3) - (y1 - y2) * (x1 - x3)) / denominator
+
+            if 0 <= t <= 1 and 0 <= u <= 1:
+                intersection_x = x1 + t * (x2 - x1)
+                intersection_y = y1 + t * (y2 - y1)
+                dist = np.sqrt((x - intersection_x)**2 + (y - intersection_y)**2)
+                min_dist = min(min_dist, dist)
+
+        distances.append(min_dist)
+
+    return distances
+
+# 向量化的感測器：牆段陣列只在建立時計算一次，所有射線與所有牆段一次求交
+class RaySensor():
+    def __init__(self, track, angles=SENSOR_ANGLES, max_distance=MAX_DISTANCE):
+        self.track = as_track(track)
+        self.x3 = self.track.p0[:, 0]
+        self.y3 = self.track.p0[:, 1]
+        self.dx34 = self.track.p0[:, 0] - self.track.p1[:, 0]
+        self.dy34 = self.track.p0[:, 1] - self.track.p1[:, 1]
+        self.sensor_radians = np.radians(np.asarray(angles, dtype=float))
+        self.max_distance = max_distance
+
+    def measure(self, x, y, angle):
+        return self.measure_batch(np.array([x], dtype=float), np.array([y], dtype=float), np.array([angle], dtype=float))[0].tolist()
+
+    # xs, ys, angles: shape (N,)，回傳 (N, 感測器數量) 的距離
+    def measure_batch(self, xs, ys, angles):
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        x1 = xs[:, None, None]
+        y1 = ys[:, None, None]
+        abs_angle = np.radians(np.asarray(angles, dtype=float))[:, None, None] + self.sensor_radians[None, :, None]
+        x2 = x1 + self.max_distance * np.cos(abs_angle)
+        y2 = y1 + self.max_distance * np.sin(abs_angle)
+
+        segments = None
+        if self.track.use_index and xs.size:
+            # 只測試射線範圍內的牆段
+            reach = self.max_distance
+            segments = self.track.segments_in_box(xs.min() - reach, ys.min() - reach, xs.max() + reach, ys.max() + reach)
+        return self.intersect(x1, y1, x2, y2, segments)
+
+    # 射線 (x1, y1)->(x2, y2) 與牆段求交，維持與迴圈版本相同的運算順序以得到相同結果
+    def intersect(self, x1, y1, x2, y2, segments=None):
+        x3, y3, dx34, dy34 = self.x3, self.y3, self.dx34, self.dy34
+        if segments is not None:
+            x3, y3, dx34, dy34 = x3[segments], y3[segments], dx34[segments], dy34[segments]
+        if x3.size == 0:
+            return np.full(np.broadcast(x1, y1, x2, y2).shape[:-1], float(self.max_distance))
+
+        dx12 = x1 - x2
+        dy12 = y1 - y2
+        dx13 = x1 - x3
+        dy13 = y1 - y3
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denominator = dx12 * dy34 - dy12 * dx34
+            t = (dx13 * dy34 - dy13 * dx34) / denominator
+            u = -(dx12 * dy13 - dy12 * dx13) / denominator
+            hit = (denominator != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+            # x2 - x1 恰好等於 -(x1 - x2)，因此 x1 + t * (x2 - x1) == x1 - t * dx12
+            intersection_x = x1 - t * dx12
+            intersection_y = y1 - t * dy12
+            # float_power 與純量 ** 2 一樣呼叫 pow()，陣列的 ** 2 則是 x * x，最後一位可能不同
+            dist = np.sqrt(np.float_power(x1 - intersection_x, 2) + np.float_power(y1 - intersection_y, 2))
+        dist = np.where(hit, dist, self.max_distance)
+        return np.minimum(dist.min(axis=-1), self.max_distance)
+
+# 帶快取的感測器 (單台車)：車子每一步只移動約 1 單位，每條射線打到的牆段幾乎不會改變
+#   1. 車子附近的候選牆段：以 (cx, cy) 為中心、邊長 2 * (max_distance + margin) 的方框內的牆段，
+#      車子離中心不超過 margin 時射線不會離開方框，可以直接沿用
+#   2. 每條射線上一次打到的牆段：先驗證它是否仍被打到 (距離 d)，之後只需檢查 bounding box
+#      與 (x, y) 到交點這一段重疊的候選牆段是否更近；沒打到時才在候選牆段中完整搜尋
+# 所有計算與 RaySensor 相同的運算順序，結果逐位元一致；measure_batch (車隊) 不使用快取
+class CachedRaySensor(RaySensor):
+    SCALAR_CANDIDATES = 64  # 候選牆段不多於此數時以 Python 迴圈篩選 (避免 NumPy 的呼叫開銷)
+
+    def __init__(self, track, angles=SENSOR_ANGLES, max_distance=MAX_DISTANCE, margin=5.0):
+        super().__init__(track, angles, max_distance)
+        self.margin = margin
+        self.center = None
+        self.candidates = None
+        self.candidate_boxes = None  # [(牆段, xmin, ymin, xmax, ymax)]
+        self.x3_list, self.y3_list = self.x3.tolist(), self.y3.tolist()
+        self.dx34_list, self.dy34_list = self.dx34.tolist(), self.dy34.tolist()
+        self.last_hit = [None] * len(self.sensor_radians)
+        self.hits = 0       # 以上一次的牆段驗證成功的射線數
+        self.misses = 0     # 需要完整搜尋的射線數
+        self.refreshes = 0  # 重建候選牆段的次數
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset_stats(self):
+        self.hits = self.misses = self.refreshes = 0
+
+    # 車子離開上一次的方框範圍時重建候選牆段
+    def nearby(self, x, y):
+        if self.center is None or abs(x - self.center[0]) > self.margin or abs(y - self.center[1]) > self.margin:
+            reach = self.max_distance + self.margin
+            self.center = (x, y)
+            self.candidates = self.track.segments_in_box(x - reach, y - reach, x + reach, y + reach)
+            self.candidate_boxes = None
+            if self.candidates.size <= self.SCALAR_CANDIDATES:
+                boxes = np.concatenate([self.track.bbox_min[self.candidates], self.track.bbox_max[self.candidates]], axis=1).tolist()
+                self.candidate_boxes = [(i,) + tuple(box) for i, box in zip(self.candidates.tolist(), boxes)]
+            self.refreshes += 1
+        return self.candidates
+
+    # 射線與單一牆段 j 的交點距離 (與 intersect 相同的公式)，沒有相交時回傳 None
+    def distance_to(self, j, x1, y1, x2, y2):
+        dx12 = x1 - x2
+        dy12 = y1 - y2
+        dx34 = self.dx34_list[j]
+        dy34 = self.dy34_list[j]
+        dx13 = x1 - self.x3_list[j]
+        dy13 = y1 - self.y3_list[j]
+        denominator = dx12 * dy34 - dy12 * dx34
+        if denominator == 0:
+            return None
+        t = (dx13 * dy34 - dy13 * dx34) / denominator
+        u = -(dx12 * dy13 - dy12 * dx13) / denominator
+        if not (0 <= t <= 1 and 0 <= u <= 1):
+            return None
+        intersection_x = x1 - t * dx12
+        intersection_y = y1 - t * dy12
+        return math.sqrt((x1 - intersection_x) ** 2 + (y1 - intersection_y) ** 2)
+
+    def measure(self, x, y, angle):
+        # 射線終點與 RaySensor.measure_batch 相同的 NumPy 運算 (逐元素運算，結果與形狀無關)
+        abs_angle = np.radians(np.float64(angle)) + self.sensor_radians
+        x1, y1 = float(x), float(y)
+        ends = list(zip((x1 + self.max_distance * np.cos(abs_angle)).tolist(), (y1 + self.max_distance * np.sin(abs_angle)).tolist()))
+        candidates = self.nearby(x1, y1)
+
+        distances = []
+        missed = []
+        for k, (ex, ey) in enumerate(ends):
+            j = self.last_hit[k]
+            dist = self.distance_to(j, x1, y1, ex, ey) if j is not None else None
+            if dist is not None:
+                self.hits += 1
+                for i in self.closer_candidates(candidates, x1, y1, ex, ey, dist):
+                    if i != j:
+                        d = self.distance_to(i, x1, y1, ex, ey)
+                        if d is not None and d < dist:
+                            dist, j = d, i
+                self.last_hit[k] = j
+                dist = min(dist, float(self.max_distance))
+            else:
+                missed.append(k)
+            distances.append(dist)
+
+        if missed:
+            # 驗證失敗的射線一起在候選牆段中完整搜尋
+            self.misses += len(missed)
+            for k, (dist, j) in zip(missed, self.search(candidates, x1, y1, [ends[k] for k in missed])):
+                self.last_hit[k] = j
+                distances[k] = dist
+        return distances
+
+    # 只有與 (x1, y1) 到交點的 bounding box 重疊的牆段可能更近 (稍微放大方框以涵蓋捨入誤差)
+    def closer_candidates(self, candidates, x1, y1, x2, y2, dist):
+        scale = dist / self.max_distance
+        ix, iy = x1 + (x2 - x1) * scale, y1 + (y2 - y1) * scale
+        eps = 1e-9 * (1 + abs(x1) + abs(y1) + self.max_distance)
+        xmin, xmax = min(x1, ix) - eps, max(x1, ix) + eps
+        ymin, ymax = min(y1, iy) - eps, max(y1, iy) + eps
+        if self.candidate_boxes is not None:
+            return [box[0] for box in self.candidate_boxes if box[3] >= xmin and box[1] <= xmax and box[4] >= ymin and box[2] <= ymax]
+        bbox_min, bbox_max = self.track.bbox_min[candidates], self.track.bbox_max[candidates]
+        near = (bbox_max[:, 0] >= xmin) & (bbox_min[:, 0] <= xmax) & (bbox_max[:, 1] >= ymin) & (bbox_min[:, 1] <= ymax)
+        return candidates[near].tolist()
+
+    # 在候選牆段中完整搜尋多條射線 (起點相同，ends 為終點)，回傳每條射線的 (距離, 最近的牆段)，沒有相交時牆段為 None
+    def search(self, candidates, x1, y1, ends):
+        if candidates.size == 0:
+            return [(float(self.max_distance), None)] * len(ends)
+        x2 = np.array([end[0] for end in ends])[:, None]
+        y2 = np.array([end[1] for end in ends])[:, None]
+        dx12 = x1 - x2
+        dy12 = y1 - y2
+        dx34, dy34 = self.dx34[candidates], self.dy34[candidates]
+        dx13 = x1 - self.x3[candidates]
+        dy13 = y1 - self.y3[candidates]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denominator = dx12 * dy34 - dy12 * dx34
+            t = (dx13 * dy34 - dy13 * dx34) / denominator
+            u = -(dx12 * dy13 - dy12 * dx13) / denominator
+            hit = (denominator != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+            intersection_x = x1 - t * dx12
+            intersection_y = y1 - t * dy12
+            dist = np.sqrt(np.float_power(x1 - intersection_x, 2) + np.float_power(y1 - intersection_y, 2))
+        dist = np.where(hit, dist, np.inf)
+        nearest = np.argmin(dist, axis=1)
+        rows = np.arange(len(ends))
+        found = hit[rows, nearest].tolist()
+        best = np.minimum(dist[rows, nearest], self.max_distance).tolist()
+        segments = candidates[nearest].tolist()
+        return [(d, j if ok else None) for d, j, ok in zip(best, segments, found)]
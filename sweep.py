@@ -0,0 +1,139 @@
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from trainer import Trainer
+from qlearn import metadata_path
+
+PARAMS = ['lrn_rate', 'gamma', 'epsilon', 'discount', 'episodes']
+FIELDS = ['run', 'config', 'seed'] + PARAMS + ['success_episode', 'successes', 'best_total_reward', 'steps_to_finish', 'total_steps', 'seconds', 'qtable']
+CONFIG_FIELDS = ['config'] + PARAMS + ['best_run', 'best_total_reward', 'success_episode', 'qtable']
+
+# 所有參數組合 (grid search)
+def grid_configs(space):
+    return [dict(zip(PARAMS, values)) for values in itertools.product(*[space[p] for p in PARAMS])]
+
+# 在每個參數的 [min, max] 範圍內隨機取樣 (random search)，episodes 從給定的值中挑選
+def random_configs(space, samples, seed=0):
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(samples):
+        config = {p: float(rng.uniform(min(space[p]), max(space[p]))) for p in PARAMS if p != 'episodes'}
+        config['episodes'] = int(rng.choice(space['episodes']))
+        configs.append(config)
+    return configs
+
+# 在子行程中執行一次完整訓練
+def run_config(run, index, config, seed, track_file, max_steps, fleet_size, output_dir):
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer = Trainer(track_file, config['lrn_rate'], config['gamma'], config['epsilon'], config['discount'], max_steps, seed=seed)
+        history = trainer.train(config['episodes'], fleet_size=fleet_size)
+        qtable = ''
+        if trainer.model.q_table is not None:
+            qtable = os.path.join(output_dir, f'run_{run:04d}.npy')
+            trainer.model.save_q_table(qtable)
+
+    finished = [s for s in history if s.finished]
+    result = {'run': run, 'config': index, 'seed': seed}
+    result.update(config)
+    result.update({
+        'success_episode': finished[0].episode if finished else '',
+        'successes': len(finished),
+        'best_total_reward': trainer.best_reward,
+        'steps_to_finish': min(s.steps for s in finished) if finished else '',
+        'total_steps': sum(s.steps for s in history),
+        'seconds': round(time.perf_counter() - start_time, 3),
+        'qtable': qtable,
+    })
+    return result
+
+# 每個參數組合中 best_total_reward 最高的一次 (同分取較早的 run)，其 Q-table 複製為 config_XXXX.npy
+def best_per_config(results, output_dir):
+    best = {}
+    for result in results:
+        current = best.get(result['config'])
+        if current is None or result['best_total_reward'] > current['best_total_reward']:
+            best[result['config']] = result
+    rows = []
+    for index, result in sorted(best.items()):
+        qtable = ''
+        if result['qtable']:
+            qtable = os.path.join(output_dir, f'config_{index:04d}.npy')
+            shutil.copyfile(result['qtable'], qtable)
+            shutil.copyfile(metadata_path(result['qtable']), metadata_path(qtable))
+        row = {p: result[p] for p in PARAMS}
+        row.update({
+            'config': index,
+            'best_run': result['run'],
+            'best_total_reward': result['best_total_reward'],
+            'success_episode': result['success_episode'],
+            'qtable': qtable,
+        })
+        rows.append(row)
+    return rows
+
+def run_sweep(configs, repeats=1, base_seed=0, track_file='track.txt', max_steps=2000, fleet_size=1, output_dir='sweep_results', workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    track_file = os.path.abspath(track_file)
+    jobs = []
+    for i, config in enumerate(configs):
+        for r in range(repeats):
+            jobs.append((len(jobs), i, config, base_seed + i * repeats + r))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(run_config, run, index, config, seed, track_file, max_steps, fleet_size, output_dir) for run, index, config, seed in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"Run {result['run'] + 1}/{len(jobs)}: success episode {result['success_episode'] or '-'}, best total reward {result['best_total_reward']} ({result['seconds']}s)")
+
+    results.sort(key=lambda r: r['run'])
+    with open(os.path.join(output_dir, 'results.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    with open(os.path.join(output_dir, 'configs.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CONFIG_FIELDS)
+        writer.writeheader()
+        writer.writerows(best_per_config(results, output_dir))
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hyperparameter sweep over QLearn parameters on a process pool')
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=20, help='number of random configurations')
+    parser.add_argument('--lr', type=float, nargs='+', default=[0.05], help='learning rate values (random mode: range)')
+    parser.add_argument('--gamma', type=float, nargs='+', default=[0.8], help='discount factor values (random mode: range)')
+    parser.add_argument('--epsilon', type=float, nargs='+', default=[1.0], help='epsilon values (random mode: range)')
+    parser.add_argument('--decay', type=float, nargs='+', default=None, help='epsilon decay values (defaults to the discount factor)')
+    parser.add_argument('--episodes', type=int, nargs='+', default=[300])
+    parser.add_argument('--repeats', type=int, default=1, help='runs per configuration with different seeds')
+    parser.add_argument('--seed', type=int, default=0, help='base seed')
+    parser.add_argument('--max-steps', type=int, default=2000)
+    parser.add_argument('--fleet', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--track', default='track.txt')
+    parser.add_argument('--output', default='sweep_results')
+    args = parser.parse_args()
+
+    space = {'lrn_rate': args.lr, 'gamma': args.gamma, 'epsilon': args.epsilon, 'discount': args.decay, 'episodes': args.episodes}
+    if args.decay is None:
+        # 與 GUI 相同：epsilon 衰減率等於 discount factor
+        space['discount'] = [0.0]
+        configs = grid_configs(space) if args.mode == 'grid' else random_configs(space, args.samples, args.seed)
+        for config in configs:
+            config['discount'] = config['gamma']
+    else:
+        configs = grid_configs(space) if args.mode == 'grid' else random_configs(space, args.samples, args.seed)
+
+    start_time = time.perf_counter()
+    results = run_sweep(configs, args.repeats, args.seed, args.track, args.max_steps, args.fleet, args.output, args.workers)
+    print(f'{len(results)} runs in {time.perf_counter() - start_time:.1f}s, results written to {os.path.join(args.output, "results.csv")} (best run per configuration in configs.csv)')
@@ -0,0 +1,121 @@
+import os
+import sys
+import math
+import numpy as np
+
+INDEX_THRESHOLD = 64  # 牆段數量少於此值時直接掃描全部牆段比查詢索引更快
+
+# 預先編譯的賽道：牆段以連續陣列儲存，並建立 uniform grid 空間索引
+class Track():
+    def __init__(self, boundaries, start=None, finish_top_left=None, finish_bottom_right=None, cell_size=None):
+        self.boundaries = [list(point) for point in boundaries]  # 原始的牆壁頂點 (供繪圖使用)
+        self.start = start
+        self.finish_top_left = finish_top_left
+        self.finish_bottom_right = finish_bottom_right
+
+        points = np.asarray(boundaries, dtype=float).reshape(-1, 2)
+        self.p0 = points[:-1]                      # 牆段起點 (S, 2)
+        self.p1 = points[1:]                       # 牆段終點 (S, 2)
+        self.direction = self.p1 - self.p0         # 方向向量
+        self.length = np.hypot(self.direction[:, 0], self.direction[:, 1])
+        self.bbox_min = np.minimum(self.p0, self.p1)
+        self.bbox_max = np.maximum(self.p0, self.p1)
+        self.segment_count = len(self.p0)
+        self.use_index = self.segment_count >= INDEX_THRESHOLD
+        self.all_segments = np.arange(self.segment_count)
+        self.build_grid(cell_size)
+
+    @classmethod
+    def from_file(cls, filename="track.txt", cell_size=None):
+        if hasattr(sys, '_MEIPASS'):
+            path = os.path.join(sys._MEIPASS, filename)
+        else:
+            path = os.path.join(os.path.abspath("."), filename)
+
+        with open(path, 'r') as f:
+            lines = [line for line in f.readlines() if line.strip()]
+
+        # “起點座標”及“起點與水平線之的夾角”
+        start = [float(coord) for coord in lines[0].strip().split(',')]
+        # “終點區域左上角座標”及“終點區域右下角座標”
+        finish_top_left = [float(coord) for coord in lines[1].strip().split(',')]
+        finish_bottom_right = [float(coord) for coord in lines[2].strip().split(',')]
+        # “賽道邊界”
+        boundaries = [[float(coord) for coord in line.strip().split(',')] for line in lines[3:]]
+        return cls(boundaries, start, finish_top_left, finish_bottom_right, cell_size)
+
+    # 將每個牆段的 bounding box 登記到覆蓋的格子中 (CSR 格式：cell_start / cell_items)
+    def build_grid(self, cell_size=None):
+        if self.segment_count == 0:
+            self.origin = np.zeros(2)
+            self.cell_size = 1.0
+            self.grid_shape = (1, 1)
+            self.cell_start = np.zeros(2, dtype=np.int64)
+            self.cell_items = np.zeros(0, dtype=np.int64)
+            return
+
+        lower = self.bbox_min.min(axis=0)
+        upper = self.bbox_max.max(axis=0)
+        if cell_size is None:
+            extent = max(upper - lower)
+            cell_size = max(extent / max(1, math.ceil(math.sqrt(self.segment_count))), 1e-6)
+        self.origin = lower
+        self.cell_size = float(cell_size)
+        nx, ny = (np.floor((upper - lower) / self.cell_size).astype(int) + 1).tolist()
+        self.grid_shape = (nx, ny)
+
+        cmin = self.cell_of(self.bbox_min)
+        cmax = self.cell_of(self.bbox_max)
+        cells = []
+        items = []
+        for s in range(self.segment_count):
+            ix, iy = np.meshgrid(np.arange(cmin[s, 0], cmax[s, 0] + 1), np.arange(cmin[s, 1], cmax[s, 1] + 1))
+            ids = (ix * ny + iy).ravel()
+            cells.append(ids)
+            items.append(np.full(ids.size, s))
+        cells = np.concatenate(cells)
+        items = np.concatenate(items)
+        order = np.argsort(cells, kind='stable')
+        self.cell_items = items[order]
+        self.cell_start = np.searchsorted(cells[order], np.arange(nx * ny + 1))
+
+    def cell_of(self, xy):
+        cell = np.floor((np.asarray(xy, dtype=float) - self.origin) / self.cell_size).astype(int)
+        return np.clip(cell, 0, np.array(self.grid_shape) - 1)
+
+    # 回傳 bounding box 可能與查詢範圍重疊的牆段索引 (保守的超集合，已排序且不重複)
+    def segments_in_box(self, xmin, ymin, xmax, ymax):
+        if not self.use_index:
+            return self.all_segments
+        nx, ny = self.grid_shape
+        lower = self.origin
+        upper = self.origin + self.cell_size * np.array(self.grid_shape)
+        if xmax < lower[0] or ymax < lower[1] or xmin > upper[0] or ymin > upper[1]:
+            return self.all_segments[:0]
+        (cx0, cy0), (cx1, cy1) = self.cell_of([[xmin, ymin], [xmax, ymax]]).tolist()
+        ids = (np.arange(cx0, cx1 + 1)[:, None] * ny + np.arange(cy0, cy1 + 1)[None, :]).ravel()
+        starts = self.cell_start[ids]
+        counts = self.cell_start[ids + 1] - starts
+        total = counts.sum()
+        if total == 0:
+            return self.all_segments[:0]
+        # 一次取出所有格子的牆段：每個位置 = 所屬格子的起點 + 格內偏移
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidates = self.cell_items[np.repeat(starts, counts) + offsets]
+        candidates = np.unique(candidates)
+        # 以 bounding box 再篩選一次
+        keep = (self.bbox_max[candidates, 0] >= xmin) & (self.bbox_min[candidates, 0] <= xmax) & (self.bbox_max[candidates, 1] >= ymin) & (self.bbox_min[candidates, 1] <= ymax)
+        return candidates[keep]
+
+    # 距離 (x, y) 在 radius 範圍內可能存在的牆段
+    def segments_near(self, x, y, radius):
+        return self.segments_in_box(x - radius, y - radius, x + radius, y + radius)
+
+    def check_finish(self, x, y):
+        return self.finish_top_left[0] <= x <= self.finish_bottom_right[0] and self.finish_bottom_right[1] <= y
+
+# 允許傳入 Track 或原始的頂點列表
+def as_track(track):
+    if isinstance(track, Track):
+        return track
+    return Track(track)
@@ -0,0 +1,94 @@
+import argparse
+import time
+import numpy as np
+from trainer import Trainer
+from recorder import EpisodeRecorder
+from profiler import Profiler
+from qlearn import check_state_bins
+
+# --bins："a,b,c" 為三個感測器共用，"a,b;c,d;e,f" 為前;左;右各自的邊界
+def parse_bins(text):
+    try:
+        bins = [[float(v) for v in part.split(',')] for part in text.split(';')]
+        bins = bins[0] if len(bins) == 1 else bins
+        check_state_bins(bins)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return bins
+
+# --batch-size / --replay-every 必須為正數 (replay_every <= 0 時批次更新的迴圈不會結束)，--replay 可為 0 (停用)
+def positive(kind, allow_zero=False):
+    def parse(text):
+        value = kind(text)
+        if value < 0 or value == 0 and not allow_zero:
+            raise argparse.ArgumentTypeError(f'must be {"non-negative" if allow_zero else "positive"}, got {text}')
+        return value
+    parse.__name__ = kind.__name__  # argparse 以此顯示 "invalid int value"
+    return parse
+
+# Headless training entry point
+parser = argparse.ArgumentParser(description='Train the self-driving car Q-table without the GUI')
+parser.add_argument('--episodes', type=int, default=300)
+parser.add_argument('--lr', type=float, default=0.05, help='learning rate')
+parser.add_argument('--gamma', type=float, default=0.8, help='discount factor')
+parser.add_argument('--epsilon', type=float, default=1.0)
+parser.add_argument('--decay', type=float, default=None, help='epsilon decay rate (defaults to the discount factor, as in the GUI)')
+parser.add_argument('--lam', type=float, default=None, help='eligibility trace decay; enables Q(lambda)/SARSA(lambda)')
+parser.add_argument('--trace', choices=['watkins', 'sarsa'], default='watkins', help='trace variant used with --lam')
+parser.add_argument('--replay', type=positive(int, allow_zero=True), default=0, help='experience replay capacity (0 to disable)')
+parser.add_argument('--batch-size', type=positive(int), default=32, help='replay minibatch size')
+parser.add_argument('--replay-every', type=positive(float), default=1, help='simulated steps per replay minibatch (below 1 for several per step)')
+parser.add_argument('--max-steps', type=int, default=2000, help='maximum steps per episode')
+parser.add_argument('--fleet', type=int, default=1, help='number of episodes simulated in parallel with CarBatch')
+parser.add_argument('--track', default='track.txt')
+parser.add_argument('--bins', type=parse_bins, default=None, help='sensor distance bin edges, e.g. "3,7,12" for all sensors or "3,7,12;2,5,9,14;2,5,9,14" for front;left;right')
+parser.add_argument('--output', default='last_qtable.npy')
+parser.add_argument('--record', default=None, help='directory for the per-step trajectory log')
+parser.add_argument('--seed', type=int, default=None, help='random seed; the same seed reproduces the same training run')
+parser.add_argument('--profile', action='store_true', help='time each phase of a step and print a summary at the end')
+parser.add_argument('--log-every', type=int, default=1, help='print stats every N episodes (0 to disable)')
+args = parser.parse_args()
+
+trainer = Trainer(
+    track_file=args.track,
+    lrn_rate=args.lr,
+    gamma=args.gamma,
+    epsilon=args.epsilon,
+    discount=args.gamma if args.decay is None else args.decay,
+    max_steps=args.max_steps,
+    recorder=EpisodeRecorder(args.record) if args.record else None,
+    state_bins=args.bins,
+    lam=args.lam,
+    trace=args.trace,
+    replay_size=args.replay,
+    batch_size=args.batch_size,
+    replay_every=args.replay_every,
+    profiler=Profiler() if args.profile else None,
+    seed=args.seed,
+)
+
+def report(stats):
+    if args.log_every and stats.episode % args.log_every == 0:
+        print(f'Episode {stats.episode}/{args.episodes}: steps={stats.steps} total_reward={stats.total_reward} finished={stats.finished} epsilon={stats.epsilon:.4f}')
+
+print('===== Start Training ====== ')
+start_time = time.perf_counter()
+history = trainer.train(args.episodes, callback=report, fleet_size=args.fleet)
+elapsed = time.perf_counter() - start_time
+
+finished = [s.episode for s in history if s.finished]
+total_steps = sum(s.steps for s in history)
+print('===== Training Done ====== ')
+print(f'{args.episodes} episodes, {total_steps} steps in {elapsed:.2f}s ({args.episodes / elapsed:.1f} episodes/s, {total_steps / elapsed:.0f} steps/s)')
+print(f'Best total reward: {trainer.best_reward}')
+if hasattr(trainer.sensors, 'hit_rate') and trainer.sensors.hits + trainer.sensors.misses:
+    print(f'Sensor cache: {trainer.sensors.hit_rate() * 100:.1f}% hits ({trainer.sensors.hits} hits, {trainer.sensors.misses} full searches, {trainer.sensors.refreshes} candidate refreshes)')
+print(f'States visited: {trainer.model.materialized_states()}/{int(np.prod(trainer.model.state_shape))}')
+print(f'First success episode: {finished[0] if finished else "-"} ({len(finished)} successful episodes)')
+if trainer.profiler is not None:
+    print('===== Profile ====== ')
+    print(trainer.profiler.summary())
+trainer.model.save_q_table(args.output)
+if trainer.recorder is not None:
+    trainer.recorder.close()
+    print(f'Trajectory log: {trainer.recorder.rows} steps in {args.record}')
@@ -0,0 +1,386 @@
+import time
+import numpy as np
+from collections import namedtuple
+from qlearn import QLearn, QLambda
+from car import Car
+from sensors import CachedRaySensor
+from fleet import CarBatch
+from track import Track
+from experience import ReplayBuffer
+from profiler import ProfiledSensor
+from kinematics import Kinematics
+
+# Statistics reported after each headless episode
+EpisodeStats = namedtuple('EpisodeStats', ['episode', 'steps', 'total_reward', 'finished', 'epsilon', 'improved'])
+
+# 單一步的輕量快照 (供繪圖使用)
+Frame = namedtuple('Frame', ['x', 'y', 'phi', 'distances', 'episode', 'step', 'done'])
+
+# 訓練時的顯示策略：
+#   'every' - 每 every 個回合即時繪製一次，其餘回合全速無繪圖模擬
+#   'best'  - 無繪圖模擬並記錄軌跡，只重播總獎勵打破紀錄的回合
+#   'final' - 訓練時完全不繪圖，結束後以最佳 Q-table 重播一次
+class DisplayPolicy():
+    MODES = ('every', 'best', 'final')
+
+    def __init__(self, mode='every', every=1):
+        if mode not in self.MODES:
+            raise ValueError(f'Unknown display mode: {mode}')
+        self.mode = mode
+        self.every = max(1, int(every))
+
+    def render_live(self, episode):
+        return self.mode == 'every' and episode % self.every == 0
+
+    def record(self):
+        return self.mode == 'best'
+
+    def render_after(self, stats):
+        return self.mode == 'best' and stats.improved
+
+    def render_final(self):
+        return self.mode == 'final'
+
+# 根據感測器距離及行駛步數計算獎勵 (與 gui 訓練時相同)
+def compute_reward(distances, steps):
+    front, left, right = distances[0], distances[1], distances[2]
+    min_dist = min(left, right)
+
+    if front > min_dist: # 代表車子目前比較屬於直線車道，如果前方感測器過於靠近障礙物，則給予懲罰
+        if front < 5:
+            reward = -5
+        elif front < 10:
+            reward = -1
+        else:
+            reward = 1
+    else: # 代表車子目前比較屬於彎道，注意左右感測器的距離
+        if min_dist < 5:
+            reward = -5
+        elif min_dist < 12:
+            reward = -1
+        else:
+            reward = 1
+
+    # 根據行駛步數給予獎勵
+    if steps > 50: # 通常在50步內會到達第二個轉角
+        if front > 10: # 如果前方感測器距離較遠，代表轉向較為成功
+            reward = 20
+        else:
+            reward = 5
+    elif steps > 30:
+        reward = 2
+    return reward
+
+# compute_reward 的向量化版本：distances 為 (N, 3)，steps 為 (N,)
+def compute_rewards(distances, steps):
+    distances = np.asarray(distances, dtype=float)
+    steps = np.asarray(steps)
+    front = distances[:, 0]
+    min_dist = np.minimum(distances[:, 1], distances[:, 2])
+
+    straight = np.where(front < 5, -5, np.where(front < 10, -1, 1))
+    corner = np.where(min_dist < 5, -5, np.where(min_dist < 12, -1, 1))
+    reward = np.where(front > min_dist, straight, corner)
+
+    reward = np.where(steps > 30, 2, reward)
+    reward = np.where(steps > 50, np.where(front > 10, 20, 5), reward)
+    return reward
+
+# 以 table 的貪婪策略在無繪圖的情況下跑完整條軌跡 (通常只需數毫秒)
+# 回傳 (frames, outcome)，outcome 為 'finish'、'collision' 或 'timeout'
+def compute_trajectory(track, model, table=None, sensors=None, max_steps=2000, episode='-'):
+    if table is None:
+        table = model.q_table
+    policy = model.compile_policy(table)
+    car = Car(track.start[0], track.start[1], track.start[2], track, sensors, Kinematics(model.action_space))
+    frames = []
+    outcome = 'timeout'
+    while len(frames) < max_steps:
+        car.set_currentTHETA(policy.act(car.get_distances()))
+        car.update_position()
+        if track.check_finish(car.currentX, car.currentY):
+            outcome = 'finish'
+        elif car.check_collision():
+            outcome = 'collision'
+        done = outcome != 'timeout' or len(frames) + 1 >= max_steps
+        frames.append(Frame(car.currentX, car.currentY, car.currentPHI, car.get_distances(), episode, len(frames) + 1, done))
+        if done:
+            break
+    return frames, outcome
+
+# 以編譯好的策略 (policy.GreedyPolicy) 同時評估多個起點，starts 為 (N, 3) 的 (x, y, phi)
+# 回傳 (steps, outcomes)，outcomes 的值同 compute_trajectory
+def evaluate_policy(track, policy, starts, sensors=None, max_steps=2000):
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    batch = CarBatch(len(starts), starts[:, 0], starts[:, 1], starts[:, 2], track, sensors)
+    batch.distances[:] = batch.sensors.measure_batch(batch.X, batch.Y, batch.PHI)
+    top_left, bottom_right = batch.track.finish_top_left, batch.track.finish_bottom_right
+    steps = np.zeros(len(starts), dtype=int)
+    outcomes = np.full(len(starts), 'timeout', dtype=object)
+    while batch.active.any():
+        _, collided = batch.step(policy.act_batch(batch.distances))
+        finish = batch.active & (top_left[0] <= batch.X) & (batch.X <= bottom_right[0]) & (bottom_right[1] <= batch.Y)
+        collided = batch.active & ~finish & collided
+        steps[batch.active] += 1
+        outcomes[finish] = 'finish'
+        outcomes[collided] = 'collision'
+        batch.active &= ~(finish | collided | (steps >= max_steps))
+    return steps, outcomes
+
+# Headless training engine: same reward shaping and epsilon schedule as gui, without rendering
+class Trainer():
+    FINISH_REWARD = 10000
+    COLLISION_REWARD = -10
+
+    def __init__(self, track_file="track.txt", lrn_rate=0.05, gamma=0.8, epsilon=1.0, discount=0.8, max_steps=2000, track=None, recorder=None, state_bins=None, lam=None, trace='watkins',
+                 replay_size=0, batch_size=32, replay_every=1, profiler=None, seed=None):
+        self.track = track if track is not None else Track.from_file(track_file)  # 賽道只解析一次，所有回合共用
+        self.start = self.track.start
+        self.finish_top_left = self.track.finish_top_left
+        self.finish_bottom_right = self.track.finish_bottom_right
+        self.sensors = CachedRaySensor(self.track)  # 單台車時沿用上一步打到的牆段
+        # profiler.Profiler：記錄每個階段的時間 (None 表示停用)
+        self.profiler = profiler
+        if profiler is not None:
+            self.sensors = ProfiledSensor(self.sensors, profiler)
+        self.max_steps = max_steps  # 避免車子原地打轉造成無窮迴圈
+        self.best_reward = 0
+        self.history = []
+        self.last_frames = []
+        self.recorder = recorder  # recorder.EpisodeRecorder：記錄每一步 (可為 None)
+        # 經驗回放：每 replay_every 個模擬步 (可小於 1) 從最近 replay_size 筆轉移取 batch_size 筆做一次批次更新
+        if batch_size <= 0 or replay_every <= 0:
+            raise ValueError(f'batch_size and replay_every must be positive, got {batch_size} and {replay_every}')
+        if replay_size < 0:
+            raise ValueError(f'replay_size must be non-negative, got {replay_size}')
+        self.buffer = None
+        self.batch_size = batch_size
+        self.replay_every = replay_every
+        self.replay_steps = 0
+
+        if lam is None:
+            self.model = QLearn(lrn_rate=lrn_rate, gamma=gamma, epsilon=epsilon, discount=discount, state_bins=state_bins, seed=seed)
+        else:
+            # lam：以 eligibility trace 學習 (trace 為 'watkins' 或 'sarsa')
+            self.model = QLambda(lrn_rate=lrn_rate, gamma=gamma, epsilon=epsilon, discount=discount, state_bins=state_bins, lam=lam, mode=trace, seed=seed)
+        self.model.initialize_q_table()
+        self.kinematics = Kinematics(self.model.action_space)  # 所有車子共用的運動學查表
+        if replay_size:
+            self.buffer = ReplayBuffer(replay_size, seed=self.model.rng)  # 與 learner 共用亂數產生器
+
+    def new_car(self):
+        return Car(self.start[0], self.start[1], self.start[2], self.track, self.sensors, self.kinematics)
+
+    def check_finish(self, car):
+        return self.track.check_finish(car.currentX, car.currentY)
+
+    def frame(self, car, episode, step, done=False):
+        return Frame(car.currentX, car.currentY, car.currentPHI, car.get_distances(), episode, step, done)
+
+    # on_frame：每一步呼叫一次 (即時繪圖)；record：把每一步的 Frame 存到 self.last_frames
+    def run_episode(self, episode, on_frame=None, record=False):
+        model = self.model
+        model.start_episode()
+        car = self.new_car()
+        state = model.discretize_state(car.get_distances())
+        total_reward = 0
+        steps = 0
+        finished = False
+        self.last_frames = []
+        if on_frame is None and record:
+            on_frame = self.last_frames.append
+
+        prof = self.profiler
+        clock = time.perf_counter
+        while steps < self.max_steps:
+            if prof is not None:
+                t = clock()
+            action = model.choose_action(state)
+            if prof is not None:
+                t = prof.lap('choose', t)
+            car.set_currentTHETA(action)
+            car.update_position()
+            if prof is not None:
+                t = prof.lap('move', t)
+
+            finish = self.check_finish(car)
+            collided = not finish and car.check_collision()
+            if prof is not None:
+                t = prof.lap('collision', t)
+            done = True
+            if finish:
+                reward = self.FINISH_REWARD
+                model.epsilon *= 0.5  # 衰減探索率
+                model.update_qtable()  # 儲存最好的 Q Table
+                finished = True
+            elif collided:
+                reward = self.COLLISION_REWARD
+            else:
+                reward = compute_reward(car.get_distances(), steps)
+                done = False
+            if prof is not None:
+                t = prof.lap('reward', t)
+
+            next_state = model.discretize_state(car.get_distances())
+            model.update_q_value(state, action, reward, next_state)
+            if self.buffer is not None:
+                self.buffer.add(state, action, reward, next_state, done)
+                self.learn_from_replay()
+            if prof is not None:
+                t = prof.lap('update', t)
+            if self.recorder is not None:
+                self.recorder.record_car(episode, steps + 1, car, state, action, reward)
+                if prof is not None:
+                    t = prof.lap('record', t)
+            state = next_state
+            total_reward += reward
+            steps += 1
+            if on_frame is not None:
+                on_frame(self.frame(car, episode, steps, done or steps >= self.max_steps))
+                if prof is not None:
+                    prof.lap('frame', t)
+            if done:
+                break
+
+        if prof is not None:
+            prof.count('steps', steps)
+        return self.finish_episode(episode, steps, total_reward, finished)
+
+    # steps 個模擬步之後做對應次數的批次更新 (經驗回放中的轉移足夠一批時才開始)
+    def learn_from_replay(self, steps=1):
+        if len(self.buffer) < self.batch_size:
+            return
+        self.replay_steps += steps
+        while self.replay_steps >= self.replay_every:
+            self.replay_steps -= self.replay_every
+            self.model.update_batch(*self.buffer.sample(self.batch_size))
+
+    def finish_episode(self, episode, steps, total_reward, finished):
+        model = self.model
+        improved = total_reward > self.best_reward
+        model.episodes += 1
+        stats = EpisodeStats(episode, steps, total_reward, finished, model.epsilon, improved)
+        self.history.append(stats)
+        if improved:
+            prof = self.profiler
+            if prof is not None:
+                t = time.perf_counter()
+            self.best_reward = total_reward
+            model.epsilon *= model.decay  # 衰減探索率
+            model.update_qtable()  # 儲存最好的 Q Table
+            if prof is not None:
+                prof.lap('snapshot', t)
+        if self.profiler is not None:
+            self.profiler.count('episodes')
+        return stats
+
+    # 以 table (預設為最佳 Q-table) 的貪婪策略跑一次，不更新 Q 值，回傳 (steps, finished)
+    def replay(self, table=None, on_frame=None, episode='-'):
+        model = self.model
+        if table is None:
+            table = model.q_table if model.q_table is not None else model.temp_qtable
+        frames, outcome = compute_trajectory(self.track, model, table, self.sensors, self.max_steps, episode)
+        if on_frame is not None:
+            for frame in frames:
+                on_frame(frame)
+        return len(frames), outcome == 'finish'
+
+    # 以 CarBatch 同時模擬 count 個回合，所有車子共用同一個 Q-table
+    def run_fleet(self, count, first_episode=1):
+        model = self.model
+        batch = CarBatch(count, self.start[0], self.start[1], self.start[2], self.track, self.sensors, kinematics=self.kinematics)
+        states = model.discretize_state(batch.distances)
+        actions = np.zeros(count, dtype=int)
+        total_rewards = np.zeros(count)
+        steps = np.zeros(count, dtype=int)
+        finished = np.zeros(count, dtype=bool)
+        results = [None] * count
+        pending = [[] for _ in range(count)]  # 每台車的記錄，回合結束時才寫入以保持同一回合的列連續
+
+        prof = self.profiler
+        clock = time.perf_counter
+        while batch.active.any():
+            if prof is not None:
+                t = clock()
+            active = np.flatnonzero(batch.active)
+            actions[active] = model.choose_actions(states[active])
+            if prof is not None:
+                t = prof.lap('choose', t)
+            batch.update_position(actions)
+            distances = batch.distances
+            if prof is not None:
+                t = prof.lap('move', t)
+            collided = batch.check_collision()
+
+            finish = batch.active & (self.finish_top_left[0] <= batch.X) & (batch.X <= self.finish_bottom_right[0]) & (self.finish_bottom_right[1] <= batch.Y)
+            collided = batch.active & ~finish & collided
+            if prof is not None:
+                t = prof.lap('collision', t)
+            rewards = compute_rewards(distances, steps)
+            rewards[finish] = self.FINISH_REWARD
+            rewards[collided] = self.COLLISION_REWARD
+            if prof is not None:
+                t = prof.lap('reward', t)
+
+            next_distances = distances.tolist()
+            next_array = model.discretize_state(distances)
+            next_states = next_array.tolist()
+            if self.buffer is not None:
+                self.buffer.add_batch(states[active], actions[active], rewards[active], next_array[active], (finish | collided)[active])
+            for i in active:
+                next_state = tuple(next_states[i])
+                if finish[i]:
+                    model.epsilon *= 0.5  # 衰減探索率
+                    model.update_qtable()  # 儲存最好的 Q Table
+                model.update_q_value(tuple(states[i]), actions[i], rewards[i], next_state)
+                if self.recorder is not None:
+                    pending[i].append((first_episode + i, steps[i] + 1, batch.X[i], batch.Y[i], batch.PHI[i], batch.THETA[i], next_distances[i], states[i].copy(), actions[i], rewards[i]))
+                states[i] = next_state
+            if self.buffer is not None:
+                self.learn_from_replay(len(active))
+            if prof is not None:
+                prof.lap('update', t)
+                prof.count('steps', len(active))
+            total_rewards[active] += rewards[active]
+            steps[active] += 1
+            finished |= finish
+
+            done = finish | collided | (batch.active & (steps >= self.max_steps))
+            batch.active &= ~done
+            for i in np.flatnonzero(done):
+                for row in pending[i]:
+                    self.recorder.record(*row)
+                pending[i] = []
+                results[i] = self.finish_episode(first_episode + i, int(steps[i]), int(total_rewards[i]), bool(finished[i]))
+        return results
+
+    # fleet_size > 1 時以 CarBatch 平行模擬多個回合 (此時 display 只支援 'final')
+    # display 為 DisplayPolicy，on_frame 接收即時繪製的 Frame
+    def train(self, episodes, callback=None, fleet_size=1, display=None, on_frame=None, on_replay=None):
+        if display is not None and display.mode != 'final' or not self.model.supports_fleet:
+            fleet_size = 1
+        # on_replay(frames)：'best' 與 'final' 模式的重播一次收到整個回合 (未指定時逐一送到 on_frame)
+        replay_to = on_replay
+        if replay_to is None and on_frame is not None:
+            replay_to = lambda frames: [on_frame(frame) for frame in frames]
+        episode = 1
+        while episode <= episodes:
+            if fleet_size > 1:
+                results = self.run_fleet(min(fleet_size, episodes - episode + 1), episode)
+            elif display is not None and replay_to is not None:
+                live = on_frame if display.render_live(episode) else None
+                results = [self.run_episode(episode, on_frame=live, record=display.record())]
+                if display.render_after(results[0]):
+                    replay_to(list(self.last_frames))
+            else:
+                results = [self.run_episode(episode)]
+            episode += len(results)
+            if callback is not None:
+                for stats in results:
+                    callback(stats)
+
+        if display is not None and replay_to is not None and display.render_final():
+            frames = []
+            self.replay(on_frame=frames.append)
+            replay_to(frames)
+        return self.history